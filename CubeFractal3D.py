@@ -1,13 +1,372 @@
+import argparse
+import os
+import time
+from functools import partial
 import numpy as np
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
-from mpl_toolkits.mplot3d.art3d import Poly3DCollection
-import tkinter as tk
-from tkinter import ttk
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from mpl_toolkits.mplot3d import Axes3D, proj3d
+from mpl_toolkits.mplot3d.art3d import Poly3DCollection, Line3DCollection
+from matplotlib.colors import to_rgba_array
+from CubeGeometry3D import CubeLevels, CubeMesh, generate_cube_levels, refine_view, view_direction, front_surface_mask
+from CubeRaster3D import CubeViewport, to_ppm
+from FractalBatch import load_sweep, output_path, agg_figure
+from FractalCache import GeometryCache
+from FractalExport import export_cube, open_fractal
+from FractalMovie import MOVIE_EXTENSIONS, movie_palette, iter_write_movie
+from FractalVector import write_obj, write_stl
+from FractalProfiler import NULL_PROFILER, Profiler, ProfileOverlay, profiler_from_env
+from FractalWorker import BackgroundTask, grow_levels
+
+# tkinter, pyplot y el backend TkAgg se cargan con load_gui() al abrir la ventana,
+# para que el renderizado sin pantalla no los importe
+plt = tk = ttk = filedialog = FigureCanvasTkAgg = NavigationToolbar2Tk = None
+
+
+def load_gui():
+    """Importa los módulos de la interfaz gráfica"""
+    global plt, tk, ttk, filedialog, FigureCanvasTkAgg, NavigationToolbar2Tk
+    import matplotlib.pyplot as plt
+    import tkinter as tk
+    from tkinter import ttk, filedialog
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+
+RANDOM_COLORS = ['red', 'green', 'blue', 'purple', 'orange']
+LEVEL_COLORS = ['red', 'green', 'purple']
+
+# Tamaño en píxeles por debajo del cual un cubo ya no se subdivide en modo LOD,
+# máximo de cubos que visita el LOD (acota los segmentos a dibujar) y grados que
+# tiene que girar la vista para que se vuelva a calcular
+LOD_PIXEL_THRESHOLD = 4
+LOD_MAX_CUBES = 8000
+LOD_ANGLE_STEP = 10
+
+# Milisegundos entre fotogramas de la rotación automática y grados por fotograma
+ROTATION_MS = 50
+ROTATION_STEP = 1
+
+
+def level_palette(color_mode, num_levels):
+    """Paleta RGBA con un color por nivel, o la de RANDOM_COLORS en el modo aleatorio"""
+    if color_mode == "Aleatorio":
+        return to_rgba_array(RANDOM_COLORS)
+    # Mismos colores por nivel que asignaba el dibujo recursivo original (FractalBenchmarks.legacy_draw_cube)
+    palette = ['blue' if color_mode == "Único" else 'b']
+    for depth in range(1, num_levels):
+        if color_mode == "Niveles" and depth > 2:
+            palette.append(LEVEL_COLORS[(depth - 1) % 3])
+        else:
+            palette.append(palette[-1])
+    return to_rgba_array(palette)
+
+
+def needs_level_edges(color_mode, colors=None):
+    """Si cada nivel tiene su color, de modo que hay que guardar sus aristas aunque las de las hojas las cubran"""
+    return colors is not None or color_mode == "Niveles"
+
+
+def cube_colors(levels, color_mode):
+    """Devuelve una paleta RGBA y el índice de color de cada cubo (niveles concatenados)"""
+    counts = levels.counts()
+    palette = level_palette(color_mode, len(counts))
+    if color_mode == "Aleatorio":
+        indices = np.random.randint(len(palette), size=sum(counts))
+    else:
+        indices = np.repeat(np.arange(len(counts)), counts)
+    return palette, indices
+
+
+def draw_cube_levels(ax, levels, color_mode="Niveles", draw_diagonals=True, draw_edges=True, draw_faces=False,
+                     opaque=False, leaves=None, colors=None, mesh=None):
+    """Dibuja todos los niveles con una única colección de segmentos y otra de caras.
+
+    La geometría se toma de una CubeMesh: las aristas que comparten cubos
+    vecinos se dibujan una vez, las de los cubos subdivididos solo si
+    needs_level_edges, y de las caras solo se dibuja la superficie exterior de
+    las hojas. ``colors`` es un par (paleta, índice de color de cada cubo) que sustituye a
+    los colores de ``color_mode``, por ejemplo los guardados en un archivo
+    .fractal. ``mesh`` es la CubeMesh de ``levels`` si ya está calculada. Con
+    ``opaque`` las caras se pintan opacas y se omite lo que quedaría oculto: las
+    diagonales y todo lo que no esté en la superficie exterior orientada hacia
+    la cámara. ``leaves`` son los cubos no subdivididos de cada nivel (ver
+    refine_view), de los que salen las caras. Devuelve los artistas añadidos.
+    """
+    if len(levels) == 0:
+        return []
+
+    palette, color_index = colors if colors is not None else cube_colors(levels, color_mode)
+    artists = []
+
+    if opaque:
+        eye = view_direction(ax.elev, ax.azim)
+        lo = levels.origins[0].min(axis=0)
+        hi = (levels.origins[0] + levels.sizes[0][:, None]).max(axis=0)
+
+    if mesh is None:
+        mesh = CubeMesh.from_levels(levels, faces=draw_faces, leaves=leaves,
+                                    level_edges=needs_level_edges(color_mode, colors))
+    segments, colors, widths = [], [], []
+
+    if draw_edges:
+        edges = mesh.edge_segments()
+        edge_colors = color_index[mesh.edge_owners]
+        if opaque:
+            keep = front_surface_mask(edges, eye, lo, hi)
+            edges, edge_colors = edges[keep], edge_colors[keep]
+        segments.append(edges)
+        colors.append(edge_colors)
+        widths.append(np.full(len(segments[-1]), 0.5))
+
+    if draw_diagonals and not opaque:
+        segments.append(mesh.diagonal_segments())
+        colors.append(color_index[mesh.diagonal_owners])
+        widths.append(np.full(len(segments[-1]), 1.0))
+
+    if segments:
+        artists.append(ax.add_collection3d(Line3DCollection(np.concatenate(segments),
+                                                            colors=palette[np.concatenate(colors)],
+                                                            linewidths=np.concatenate(widths))))
+
+    if draw_faces:
+        faces = mesh.face_polygons()
+        if opaque:
+            faces = faces[front_surface_mask(faces, eye, lo, hi)]
+        artists.append(ax.add_collection3d(Poly3DCollection(faces,
+                                                            facecolors='cyan',
+                                                            linewidths=0.5,
+                                                            edgecolors='blue',
+                                                            alpha=1 if opaque else 0.1)))
+    return artists
+
+
+def screen_projector(ax):
+    """Función que lleva puntos (N, 3) a píxeles de pantalla con la vista actual de ``ax``.
+
+    La proyección y la transformación se copian al crearla, así que la función
+    no depende de cambios posteriores de ``ax`` y se puede usar en otro hilo.
+    """
+    M = ax.get_proj()
+    transform = ax.transData.frozen()
+
+    def project(points):
+        x, y, _ = proj3d.proj_transform(points[:, 0], points[:, 1], points[:, 2], M)
+        return transform.transform(np.column_stack([x, y]))
+    return project
+
+
+def view_snapshot(ax, opaque=False):
+    """Lo que necesita refine_view de la vista actual de ``ax``: proyección, rectángulo, límites y cámara"""
+    # La posición de los ejes con la que se dibujarán, que draw() ajusta a su aspecto
+    ax.apply_aspect()
+    return {
+        "project": screen_projector(ax),
+        "viewport": tuple(ax.bbox.extents),
+        "limits": tuple(np.array(bound) for bound in zip(ax.get_xlim3d(), ax.get_ylim3d(), ax.get_zlim3d())),
+        "eye": view_direction(ax.elev, ax.azim) if opaque else None,
+    }
+
+
+def build_cube_view(view, depth, draw_faces=False, pixel_threshold=LOD_PIXEL_THRESHOLD, max_cubes=LOD_MAX_CUBES,
+                    level_edges=False):
+    """Cubos del nivel de detalle para una vista de view_snapshot: (niveles, hojas, malla).
+
+    No usa matplotlib, así que se puede calcular en otro hilo (ver FractalWorker.BackgroundTask).
+    """
+    levels, leaves = refine_view(view["project"], view["viewport"], depth, origin=(0, 0, 0), size=10,
+                                 pixel_threshold=pixel_threshold, limits=view["limits"], max_cubes=max_cubes,
+                                 eye=view["eye"])
+    mesh = (CubeMesh.from_levels(levels, faces=draw_faces, leaves=leaves, level_edges=level_edges)
+            if len(levels) else None)
+    return levels, leaves, mesh
+
+
+def draw_cube_view(ax, depth, color_mode="Niveles", draw_diagonals=True, draw_edges=True, draw_faces=False,
+                   opaque=False, pixel_threshold=LOD_PIXEL_THRESHOLD, max_cubes=LOD_MAX_CUBES):
+    """Dibuja el cubo con el nivel de detalle que permite la vista actual de ``ax``.
+
+    Solo se subdividen los cubos visibles que miden al menos ``pixel_threshold``
+    píxeles, hasta un total de ``max_cubes`` cubos (primero los más grandes en
+    pantalla), así que el coste está acotado a cualquier profundidad y zoom.
+    Con ``opaque`` ni siquiera se visitan los cubos que no tocan la superficie
+    visible. Devuelve los artistas añadidos para poder sustituirlos cuando
+    cambie la vista.
+    """
+    levels, leaves, mesh = build_cube_view(view_snapshot(ax, opaque), depth, draw_faces, pixel_threshold, max_cubes,
+                                           needs_level_edges(color_mode))
+    return draw_cube_levels(ax, levels, color_mode=color_mode, draw_diagonals=draw_diagonals,
+                            draw_edges=draw_edges, draw_faces=draw_faces, opaque=opaque, leaves=leaves, mesh=mesh)
+
+
+def cube_viewport(levels, color_mode="Niveles", draw_diagonals=True, draw_edges=True, draw_faces=False,
+                  opaque=False, colors=None, mesh=None):
+    """CubeViewport con los mismos colores y partes que dibujaría draw_cube_levels"""
+    palette, color_index = colors if colors is not None else cube_colors(levels, color_mode)
+    if mesh is None:
+        # El visor pinta las aristas de los hijos encima de las de su padre: le bastan las de las hojas
+        mesh = CubeMesh.from_levels(levels, faces=draw_faces)
+    return CubeViewport(mesh, palette, color_index, draw_diagonals=draw_diagonals, draw_edges=draw_edges,
+                        draw_faces=draw_faces, opaque=opaque)
+
+
+def setup_cube_axes(ax, depth, elev=30, azim=45):
+    """Etiquetas, título, límites y vista de los ejes 3D del cubo"""
+    ax.set_xlabel('X')
+    ax.set_ylabel('Y')
+    ax.set_zlabel('Z')
+    ax.set_title(f'Cubo Fractal 3D (Niveles: {depth})')
+    ax.set_xlim(0, 10)
+    ax.set_ylim(0, 10)
+    ax.set_zlim(0, 10)
+    ax.view_init(elev=elev, azim=azim)
+
+
+def iter_cube_meshes(base, depth, draw_faces=False, cancelled=lambda: False, level_edges=False):
+    """Produce (niveles, malla) con un nivel más cada vez, desde ``base`` hasta ``depth``.
+
+    Pensado para un hilo aparte (ver FractalWorker.grow_levels).
+    """
+    for levels in grow_levels(base, depth, cancelled):
+        yield levels, CubeMesh.from_levels(levels, faces=draw_faces, level_edges=level_edges)
+
+
+def render_cube(ax, depth, color_mode="Niveles", draw_diagonals=True, draw_edges=True, draw_faces=False,
+                elev=30, azim=45, workers=None, split_depth=None, cache=None, lod=False, opaque=False,
+                profiler=NULL_PROFILER, data=None):
+    """Genera el cubo fractal y lo dibuja en unos ejes 3D con la configuración de la aplicación.
+
+    Con ``lod`` solo se generan los cubos que se distinguen en pantalla (ver
+    draw_cube_view). Con ``data`` (ver FractalExport.open_fractal) se dibujan
+    los niveles guardados hasta ``depth`` en lugar de generarlos. Los tiempos
+    de generación y de creación de artistas se anotan en ``profiler``. Devuelve
+    los artistas añadidos.
+    """
+    # Configuración del gráfico (antes de dibujar: el nivel de detalle depende de la vista)
+    setup_cube_axes(ax, depth, elev, azim)
+
+    if data is not None:
+        levels = data.levels.truncated(min(depth, data.levels.max_depth))
+        colors = (data.palette, data.colors[:len(levels)]) if len(data.palette) else None
+        with profiler.timer("artistas"):
+            artists = draw_cube_levels(ax, levels, color_mode=color_mode, draw_diagonals=draw_diagonals,
+                                       draw_edges=draw_edges, draw_faces=draw_faces, opaque=opaque, colors=colors)
+        profiler.count("artistas", len(artists))
+        return artists
+
+    if lod:
+        with profiler.timer("lod"):
+            artists = draw_cube_view(ax, depth, color_mode=color_mode, draw_diagonals=draw_diagonals,
+                                     draw_edges=draw_edges, draw_faces=draw_faces, opaque=opaque)
+        profiler.count("artistas", len(artists))
+        return artists
+
+    build = lambda d: generate_cube_levels(d, origin=(0, 0, 0), size=10, workers=workers, split_depth=split_depth)
+    with profiler.timer("geometria"):
+        levels = cache.get(("cube", 10), depth, build) if cache is not None else build(depth)
+    profiler.count("elementos", len(levels))
+
+    with profiler.timer("artistas"):
+        artists = draw_cube_levels(ax, levels, color_mode=color_mode, draw_diagonals=draw_diagonals,
+                                   draw_edges=draw_edges, draw_faces=draw_faces, opaque=opaque)
+    profiler.count("artistas", len(artists))
+    return artists
+
+
+def render_cube_image(size, depth, color_mode="Niveles", draw_diagonals=True, draw_edges=True, draw_faces=False,
+                      elev=30, azim=45, workers=None, split_depth=None, cache=None, lod=False, opaque=False,
+                      profiler=NULL_PROFILER, data=None):
+    """Como render_cube, pero pinta el cubo con un CubeViewport y devuelve la imagen RGBA (size, size, 4).
+
+    No hay nivel de detalle: ``lod`` se acepta para usar los mismos parámetros
+    que render_cube, pero se ignora.
+    """
+    if data is not None:
+        levels = data.levels.truncated(min(depth, data.levels.max_depth))
+        colors = (data.palette, data.colors[:len(levels)]) if len(data.palette) else None
+    else:
+        build = lambda d: generate_cube_levels(d, origin=(0, 0, 0), size=10, workers=workers, split_depth=split_depth)
+        with profiler.timer("geometria"):
+            levels = cache.get(("cube", 10), depth, build) if cache is not None else build(depth)
+        colors = None
+    profiler.count("elementos", len(levels))
+
+    with profiler.timer("visor"):
+        viewport = cube_viewport(levels, color_mode=color_mode, draw_diagonals=draw_diagonals, draw_edges=draw_edges,
+                                 draw_faces=draw_faces, opaque=opaque, colors=colors)
+    with profiler.timer("fotograma"):
+        return viewport.render(size, size, elev=elev, azim=azim)
+
+
+def export_fractal(path, depth, color_mode="Niveles", cache=None, draw_diagonals=True, draw_edges=True,
+                   draw_faces=True):
+    """Guarda el cubo fractal de profundidad ``depth`` en un archivo .fractal, .obj o .stl.
+
+    Solo se genera la raíz: los niveles se calculan por bloques mientras se
+    escriben, así que se pueden exportar profundidades que no caben en memoria.
+    En OBJ se guardan las partes elegidas con vértices compartidos; en STL, las caras.
+    """
+    build = lambda d: generate_cube_levels(d, origin=(0, 0, 0), size=10)
+    root = cache.get(("cube", 10), 0, build) if cache is not None else build(0)
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".obj":
+        return write_obj(path, root, depth, edges=draw_edges, diagonals=draw_diagonals, faces=draw_faces)
+    elif ext == ".stl":
+        return write_stl(path, root, depth)
+    palette = level_palette(color_mode, depth + 1)
+    if color_mode == "Aleatorio":
+        color_index = lambda d, n: np.random.randint(len(palette), size=n)
+    else:
+        color_index = lambda d, n: d
+    export_cube(path, root, max_depth=depth, palette=palette, color_index=color_index)
+
+
+# Visor de cada proceso de iter_export_rotation, creado al arrancar el proceso
+_rotation_viewport = None
+
+
+def _init_rotation_worker(arrays, colors, options):
+    """Construye el visor de iter_export_rotation a partir de los niveles guardados en arrays"""
+    global _rotation_viewport
+    _rotation_viewport = cube_viewport(CubeLevels.from_arrays(arrays), colors=colors, **options)
+
+
+def _rotation_frame(view, size):
+    elev, azim = view
+    return _rotation_viewport.render(size, size, elev=elev, azim=azim)
+
+
+def iter_export_rotation(path, depth, frames=360, size=600, fps=20, elev=30, azim=45, color_mode="Niveles",
+                         draw_diagonals=True, draw_edges=True, draw_faces=False, opaque=False, workers=None,
+                         cache=None, levels=None, cancelled=lambda: False, context=None):
+    """Guarda una vuelta completa del cubo en un .gif o .mp4 y produce el número de fotogramas escritos.
+
+    Los fotogramas se pintan sin ventana con el visor rápido (CubeViewport)
+    en ``workers`` procesos (ver FractalMovie.iter_write_movie): la geometría
+    se genera (o se toma de ``cache``) una sola vez y cada proceso construye su
+    visor al arrancar. Con ``levels`` se usan esos niveles hasta ``depth`` en
+    lugar de generarlos. Los colores se eligen aquí, así que el modo
+    "Aleatorio" es el mismo en todos los fotogramas.
+    """
+    if levels is not None and levels.max_depth >= depth:
+        levels = levels.truncated(depth)
+    else:
+        build = lambda d: generate_cube_levels(d, origin=(0, 0, 0), size=10)
+        levels = cache.get(("cube", 10), depth, build) if cache is not None else build(depth)
+    colors = cube_colors(levels, color_mode)
+    options = {"draw_diagonals": draw_diagonals, "draw_edges": draw_edges, "draw_faces": draw_faces,
+               "opaque": opaque}
+    initargs = (levels.to_arrays(), colors, options)
+    views = [(elev, azim + 360 * i / frames) for i in range(frames)]
+
+    palette = None
+    if path.lower().endswith(".gif"):
+        # Paleta común del GIF, tomada de unas cuantas vistas de la vuelta
+        _init_rotation_worker(*initargs)
+        palette = movie_palette([_rotation_frame(view, size).copy() for view in views[::max(1, frames // 8)]])
+    yield from iter_write_movie(path, views, (size, size), fps, palette, partial(_rotation_frame, size=size),
+                                workers, _init_rotation_worker, initargs, cancelled, context)
+
 
 class FractalCubeApp:
     def __init__(self, root):
+        load_gui()
         self.root = root
         self.root.title("Generador de Cubos Fractales 3D")
         
@@ -17,94 +376,41 @@ class FractalCubeApp:
         self.draw_edges = tk.BooleanVar(value=True)
         self.draw_faces = tk.BooleanVar(value=False)
         self.color_mode = tk.StringVar(value="Niveles")
+        self.lod = tk.BooleanVar(value=False)
+        self.opaque = tk.BooleanVar(value=False)
+        self.fast_view = tk.BooleanVar(value=False)
+        
+        # Artistas del modo LOD, que se sustituyen al cambiar la vista, y la vista con la que se calcularon
+        self.lod_artists = []
+        self.lod_pending = None
+        self.lod_view = None
+        
+        # Generación en segundo plano; cambiar cualquier parámetro la cancela
+        self.task = None
+        
+        # Exportación de la animación, también en segundo plano (ver export_movie)
+        self.movie_task = None
+        self.movie_title = None
+        
+        # Lo dibujado (niveles, malla, colores y opciones) para el visor rápido, que se crea al girar
+        self.shown = None
+        self.viewport = None
+        for var in (self.max_depth, self.draw_diagonals, self.draw_edges, self.draw_faces,
+                    self.color_mode, self.lod, self.opaque):
+            var.trace_add("write", lambda *_: self.cancel_generation())
+        
+        # Perfilado: activo desde el inicio con PYFRACTALS_PROFILE, si no sin coste hasta activarlo
+        self.profiler = profiler_from_env()
+        self.profile_var = tk.BooleanVar(value=self.profiler.enabled)
+        
+        # Geometría ya generada, para no recalcularla al cambiar solo la visualización
+        self.cache = GeometryCache(cache_dir=os.environ.get("PYFRACTALS_CACHE_DIR"))
         
         # Configurar la interfaz
         self.create_widgets()
         
         # Configurar el cierre adecuado
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
-    
-    def draw_cube(self, ax, origin, size, depth, max_depth, draw_diagonals=True, draw_edges=True, draw_faces=False, color='b'):
-        """Recursively draw fractal cubes with multiple visualization options"""
-        if depth > max_depth:
-            return
-        
-        x, y, z = origin
-        s = size
-        
-        # Define los 8 vértices del cubo
-        vertices = np.array([
-            [x, y, z],
-            [x+s, y, z],
-            [x+s, y+s, z],
-            [x, y+s, z],
-            [x, y, z+s],
-            [x+s, y, z+s],
-            [x+s, y+s, z+s],
-            [x, y+s, z+s]
-        ])
-        
-        # Dibuja las aristas del cubo
-        if draw_edges:
-            edges = [
-                [vertices[0], vertices[1]],
-                [vertices[1], vertices[2]],
-                [vertices[2], vertices[3]],
-                [vertices[3], vertices[0]],
-                [vertices[4], vertices[5]],
-                [vertices[5], vertices[6]],
-                [vertices[6], vertices[7]],
-                [vertices[7], vertices[4]],
-                [vertices[0], vertices[4]],
-                [vertices[1], vertices[5]],
-                [vertices[2], vertices[6]],
-                [vertices[3], vertices[7]]
-            ]
-            
-            for edge in edges:
-                ax.plot3D(*zip(*edge), color=color, linewidth=0.5)
-        
-        # Dibuja las diagonales principales
-        if draw_diagonals:
-            # Diagonal principal (vértice 0 a vértice 6)
-            ax.plot([x, x+s], [y, y+s], [z, z+s], color=color, linewidth=1)
-            # Diagonal secundaria (vértice 1 a vértice 7)
-            ax.plot([x+s, x], [y, y+s], [z, z+s], color=color, linewidth=1)
-        
-        # Dibuja las caras del cubo (opcional)
-        if draw_faces:
-            faces = [
-                [vertices[0], vertices[1], vertices[2], vertices[3]],  # abajo
-                [vertices[4], vertices[5], vertices[6], vertices[7]],  # arriba
-                [vertices[0], vertices[1], vertices[5], vertices[4]],  # frente
-                [vertices[2], vertices[3], vertices[7], vertices[6]],  # atrás
-                [vertices[1], vertices[2], vertices[6], vertices[5]],  # derecha
-                [vertices[0], vertices[3], vertices[7], vertices[4]]   # izquierda
-            ]
-            
-            ax.add_collection3d(Poly3DCollection(faces, 
-                                               facecolors='cyan', 
-                                               linewidths=0.5, 
-                                               edgecolors='blue', 
-                                               alpha=0.1))
-        
-        # Divide en 8 subcubos y aplica recursión
-        if depth < max_depth:
-            new_size = size / 2
-            for i in [0, 1]:
-                for j in [0, 1]:
-                    for k in [0, 1]:
-                        new_origin = (x + i*new_size, y + j*new_size, z + k*new_size)
-                        # Cambia el color para niveles más profundos
-                        if self.color_mode.get() == "Niveles":
-                            new_color = (color if depth < 2 else ['red', 'green', 'purple'][depth % 3])
-                        elif self.color_mode.get() == "Aleatorio":
-                            new_color = np.random.choice(['red', 'green', 'blue', 'purple', 'orange'])
-                        else:
-                            new_color = color
-                            
-                        self.draw_cube(ax, new_origin, new_size, depth+1, max_depth, 
-                                     draw_diagonals, draw_edges, draw_faces, new_color)
 
     def create_widgets(self):
         # Frame de controles
@@ -128,13 +434,30 @@ class FractalCubeApp:
         ttk.Combobox(control_frame, textvariable=self.color_mode, 
                      values=["Niveles", "Único", "Aleatorio"], state="readonly").grid(row=4, column=1)
         
+        # Nivel de detalle según la vista
+        ttk.Checkbutton(control_frame, text="Nivel de detalle (LOD)", variable=self.lod).grid(row=5, column=0, columnspan=2, sticky=tk.W)
+        ttk.Checkbutton(control_frame, text="Caras opacas", variable=self.opaque).grid(row=6, column=0, columnspan=2, sticky=tk.W)
+        
         # Botones
-        ttk.Button(control_frame, text="Generar", command=self.generate_fractal).grid(row=5, column=0, columnspan=2, pady=10)
-        ttk.Button(control_frame, text="Rotar Automático", command=self.toggle_rotation).grid(row=6, column=0, columnspan=2)
+        ttk.Button(control_frame, text="Generar", command=self.generate_fractal).grid(row=7, column=0, columnspan=2, pady=10)
+        ttk.Button(control_frame, text="Rotar Automático", command=self.toggle_rotation).grid(row=8, column=0, columnspan=2)
+        ttk.Checkbutton(control_frame, text="Visor rápido al rotar", variable=self.fast_view).grid(row=9, column=0, columnspan=2, sticky=tk.W)
+        
+        # Perfilado
+        ttk.Checkbutton(control_frame, text="Mostrar rendimiento", variable=self.profile_var,
+                        command=self.toggle_profiling).grid(row=10, column=0, columnspan=2, sticky=tk.W, pady=(10, 0))
+        ttk.Button(control_frame, text="Exportar traza", command=self.export_trace).grid(row=11, column=0, columnspan=2)
+        
+        # Geometría en archivos .fractal
+        ttk.Button(control_frame, text="Exportar geometría", command=self.export_geometry).grid(row=12, column=0, columnspan=2, pady=(10, 0))
+        ttk.Button(control_frame, text="Abrir geometría", command=self.open_geometry).grid(row=13, column=0, columnspan=2)
+        ttk.Button(control_frame, text="Exportar animación", command=self.export_movie).grid(row=14, column=0, columnspan=2, pady=(10, 0))
         
         # Frame de visualización
         self.fig = plt.figure(figsize=(10, 8))
         self.ax = self.fig.add_subplot(111, projection='3d')
+        self.overlay = ProfileOverlay(self.fig, self.profiler)
+        self.overlay.set_visible(self.profiler.enabled)
         
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.root)
         self.canvas.get_tk_widget().pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
@@ -144,48 +467,261 @@ class FractalCubeApp:
         self.toolbar.update()
         self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
         
+        # Recalcular el nivel de detalle al terminar un zoom, un giro con el ratón o un cambio de tamaño
+        self.canvas.mpl_connect('button_release_event', lambda _: self.schedule_lod())
+        self.canvas.mpl_connect('resize_event', lambda _: self.schedule_lod())
+        
+        # Visor rápido: una imagen de Tk que ocupa el lugar del canvas mientras gira
+        self.photo = tk.PhotoImage()
+        self.view_label = tk.Label(self.root, image=self.photo, background='white', borderwidth=0, highlightthickness=0)
+        self.view_label.bind("<Configure>", lambda event: setattr(self, "view_size", (event.width, event.height)))
+        self.view_size = None
+        
         # Estado de rotación automática
         self.rotating = False
+        self.fast_rotation = False
         self.rotation_id = None
     
     def update_slider_label(self):
         self.depth_label.config(text=f"Nivel: {self.max_depth.get()}")
     
     def generate_fractal(self):
+        # Pulsar "Generar" durante una generación la cancela
+        if self.task is not None:
+            self.cancel_generation()
+            return
+        
+        if self.fast_rotation:
+            self.stop_rotation()
+        self.shown = self.viewport = self.lod_view = None
         self.ax.clear()
+        depth = self.max_depth.get()
+        options = {
+            "color_mode": self.color_mode.get(),
+            "draw_diagonals": self.draw_diagonals.get(),
+            "draw_edges": self.draw_edges.get(),
+            "draw_faces": self.draw_faces.get(),
+            "opaque": self.opaque.get(),
+        }
         
-        # Configurar color inicial según el modo seleccionado
-        if self.color_mode.get() == "Único":
-            color = 'blue'
-        elif self.color_mode.get() == "Aleatorio":
-            color = np.random.choice(['red', 'green', 'blue', 'purple', 'orange'])
-        else:
-            color = 'b'  # Para modo "Niveles"
-        
-        # Llamar a la función de generación de fractales
-        self.draw_cube(
-            self.ax, 
-            origin=(0, 0, 0), 
-            size=10, 
-            depth=0, 
-            max_depth=self.max_depth.get(),
-            draw_diagonals=self.draw_diagonals.get(),
-            draw_edges=self.draw_edges.get(),
-            draw_faces=self.draw_faces.get(),
-            color=color
-        )
-        
-        # Configuración del gráfico
-        self.ax.set_xlabel('X')
-        self.ax.set_ylabel('Y')
-        self.ax.set_zlabel('Z')
-        self.ax.set_title(f'Cubo Fractal 3D (Niveles: {self.max_depth.get()})')
-        self.ax.set_xlim(0, 10)
-        self.ax.set_ylim(0, 10)
-        self.ax.set_zlim(0, 10)
-        self.ax.view_init(elev=30, azim=45)
-        
-        self.canvas.draw()
+        setup_cube_axes(self.ax, depth)
+        self.lod_artists = []
+        if self.lod.get():
+            # El nivel de detalle solo genera lo visible (con un máximo de cubos), también en otro hilo
+            view = view_snapshot(self.ax, options["opaque"])
+            lod_view = self.current_lod_view()
+            self.task = BackgroundTask(
+                self.root,
+                lambda cancelled: [build_cube_view(view, depth, options["draw_faces"],
+                                                   level_edges=needs_level_edges(options["color_mode"]))],
+                on_item=lambda item: self.show_lod(item, options, lod_view),
+                on_done=lambda item: setattr(self, "task", None)
+            ).start()
+            return
+        
+        # Los niveles y sus mallas se generan en otro hilo y se dibujan según terminan
+        base = self.cache.peek(("cube", 10))
+        if base is None:
+            base = generate_cube_levels(0, origin=(0, 0, 0), size=10)
+        self.task = BackgroundTask(
+            self.root,
+            lambda cancelled: iter_cube_meshes(base, depth, options["draw_faces"], cancelled,
+                                               needs_level_edges(options["color_mode"])),
+            on_item=lambda item: self.show_levels(item, depth, options),
+            on_done=lambda item: self.finish_generation(item, depth, options)
+        ).start()
+    
+    def show_levels(self, item, depth, options):
+        """Sustituye lo dibujado por los niveles generados hasta ahora"""
+        levels, mesh = item
+        for artist in self.lod_artists:
+            artist.remove()
+        with self.profiler.timer("artistas"):
+            self.lod_artists = draw_cube_levels(self.ax, levels, mesh=mesh, **options)
+        self.profiler.count("artistas", len(self.lod_artists))
+        self.ax.set_title(f'Cubo Fractal 3D (Niveles: {levels.max_depth} de {depth})')
+        self.draw_canvas()
+    
+    def show_lod(self, item, options, view):
+        """Dibuja los cubos del nivel de detalle calculados en segundo plano para la vista ``view``"""
+        levels, leaves, mesh = item
+        for artist in self.lod_artists:
+            artist.remove()
+        with self.profiler.timer("artistas"):
+            self.lod_artists = draw_cube_levels(self.ax, levels, leaves=leaves, mesh=mesh, **options)
+        self.lod_view = view
+        self.profiler.count("artistas", len(self.lod_artists))
+        self.draw_canvas()
+    
+    def finish_generation(self, item, depth, options):
+        self.task = None
+        levels, mesh = item
+        self.shown = (levels, mesh, None, options)
+        self.cache.put(("cube", 10), levels)
+        self.profiler.count("elementos", len(levels))
+        self.ax.set_title(f'Cubo Fractal 3D (Niveles: {depth})')
+        self.draw_canvas()
+    
+    def cancel_generation(self):
+        """Detiene la generación en curso; lo ya dibujado se queda en pantalla"""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+    
+    def draw_canvas(self):
+        """canvas.draw() midiendo su tiempo y con el resumen de rendimiento al día"""
+        self.overlay.update()
+        with self.profiler.timer("canvas.draw"):
+            self.canvas.draw()
+    
+    def toggle_profiling(self):
+        self.profiler = Profiler() if self.profile_var.get() else NULL_PROFILER
+        self.overlay.profiler = self.profiler
+        self.overlay.set_visible(self.profiler.enabled)
+        self.canvas.draw_idle()
+    
+    def export_trace(self):
+        """Guarda los datos del perfilado como traza de Chrome (chrome://tracing)"""
+        if not self.profiler.enabled:
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Traza de Chrome", "*.json")])
+        if path:
+            self.profiler.export_trace(path)
+    
+    def export_geometry(self):
+        """Guarda el cubo con la profundidad y los colores actuales en un archivo .fractal"""
+        path = filedialog.asksaveasfilename(defaultextension=".fractal",
+                                            filetypes=[("Geometría fractal", "*.fractal"), ("Wavefront OBJ", "*.obj"),
+                                                       ("STL", "*.stl")])
+        if path:
+            export_fractal(path, self.max_depth.get(), self.color_mode.get(), self.cache,
+                           self.draw_diagonals.get(), self.draw_edges.get(), self.draw_faces.get())
+    
+    def export_movie(self):
+        """Guarda una vuelta completa del cubo en un .gif o .mp4 sin bloquear la interfaz.
+        
+        Los fotogramas se pintan con el visor rápido en otros procesos; el
+        progreso se muestra en el título de la ventana y pulsar de nuevo el
+        botón cancela la exportación.
+        """
+        if self.movie_task is not None:
+            self.cancel_movie()
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".gif",
+                                            filetypes=[("GIF animado", "*.gif"), ("Vídeo MP4 (ffmpeg)", "*.mp4")])
+        if not path or os.path.splitext(path)[1].lower() not in MOVIE_EXTENSIONS:
+            return
+        depth = self.max_depth.get()
+        frames = round(360 / ROTATION_STEP)
+        options = {
+            "color_mode": self.color_mode.get(),
+            "draw_diagonals": self.draw_diagonals.get(),
+            "draw_edges": self.draw_edges.get(),
+            "draw_faces": self.draw_faces.get(),
+            "opaque": self.opaque.get(),
+        }
+        # Procesos nuevos (spawn) en lugar de copias de este, que tiene Tk e hilos en marcha
+        import multiprocessing
+        context = multiprocessing.get_context("spawn")
+        levels = self.cache.peek(("cube", 10))
+        self.movie_title = self.root.title()
+        self.movie_task = BackgroundTask(
+            self.root,
+            lambda cancelled: iter_export_rotation(path, depth, frames, fps=1000 / ROTATION_MS, levels=levels,
+                                                   cancelled=cancelled, context=context, **options),
+            on_item=lambda count: self.root.title(f"{self.movie_title} - Exportando animación: {count}/{frames}"),
+            on_done=lambda _: self.finish_movie(),
+            on_error=lambda error: self.finish_movie(f"Error al exportar la animación: {error}")
+        ).start()
+    
+    def finish_movie(self, message=None):
+        self.movie_task = None
+        self.root.title(message or self.movie_title)
+    
+    def cancel_movie(self):
+        if self.movie_task is not None:
+            self.movie_task.cancel()
+            self.finish_movie()
+    
+    def open_geometry(self):
+        """Dibuja un cubo guardado en un archivo .fractal sin volver a generarlo"""
+        path = filedialog.askopenfilename(filetypes=[("Geometría fractal", "*.fractal")])
+        if not path:
+            return
+        data = open_fractal(path)
+        if data.kind != "cube":
+            return
+        self.cancel_generation()
+        self.stop_rotation()
+        self.ax.clear()
+        options = {
+            "color_mode": self.color_mode.get(),
+            "draw_diagonals": self.draw_diagonals.get(),
+            "draw_edges": self.draw_edges.get(),
+            "draw_faces": self.draw_faces.get(),
+            "opaque": self.opaque.get(),
+        }
+        self.lod_artists = render_cube(self.ax, self.max_depth.get(), profiler=self.profiler, data=data, **options)
+        self.lod_view = None
+        levels = data.levels.truncated(min(self.max_depth.get(), data.levels.max_depth))
+        colors = (data.palette, data.colors[:len(levels)]) if len(data.palette) else None
+        self.shown = (levels, None, colors, options)
+        self.viewport = None
+        self.draw_canvas()
+    
+    def schedule_lod(self):
+        """Agrupa los eventos de la vista en un único recálculo cuando la interfaz quede libre"""
+        if self.lod.get() and self.lod_pending is None:
+            self.lod_pending = self.root.after_idle(self.refresh_lod)
+    
+    def refresh_lod(self):
+        self.update_lod()
+        self.canvas.draw_idle()
+    
+    def current_lod_view(self):
+        """Lo que determina los cubos del LOD: opciones, límites y tamaño de los ejes y orientación"""
+        limits = (self.ax.get_xlim3d(), self.ax.get_ylim3d(), self.ax.get_zlim3d())
+        options = (self.max_depth.get(), self.color_mode.get(), self.draw_diagonals.get(), self.draw_edges.get(),
+                   self.draw_faces.get(), self.opaque.get())
+        # Las caras del cubo raíz orientadas hacia la cámara (las que dibuja el modo opaco)
+        sides = tuple(np.sign(view_direction(self.ax.elev, self.ax.azim)))
+        self.ax.apply_aspect()
+        return options, limits, tuple(self.ax.bbox.extents), sides, (self.ax.elev, self.ax.azim)
+    
+    def lod_outdated(self, view):
+        """True si ``view`` difiere de la del último cálculo en algo más que un giro de menos de LOD_ANGLE_STEP"""
+        if self.lod_view is None or view[:-1] != self.lod_view[:-1]:
+            return True
+        turn = np.abs(np.subtract(view[-1], self.lod_view[-1]))
+        return bool(np.any(np.minimum(turn % 360, -turn % 360) >= LOD_ANGLE_STEP))
+    
+    def update_lod(self):
+        """Sustituye los cubos dibujados por los que se distinguen con la vista actual.
+        
+        Si desde el último cálculo la vista solo ha girado unos pocos grados
+        (por ejemplo, en la rotación automática), se conservan los cubos ya
+        dibujados, y mientras se calculan en segundo plano no se hace nada.
+        """
+        self.lod_pending = None
+        if not self.lod.get() or self.task is not None:
+            return
+        view = self.current_lod_view()
+        if not self.lod_outdated(view):
+            return
+        for artist in self.lod_artists:
+            artist.remove()
+        with self.profiler.timer("lod"):
+            self.lod_artists = draw_cube_view(
+                self.ax,
+                self.max_depth.get(),
+                color_mode=self.color_mode.get(),
+                draw_diagonals=self.draw_diagonals.get(),
+                draw_edges=self.draw_edges.get(),
+                draw_faces=self.draw_faces.get(),
+                opaque=self.opaque.get()
+            )
+        self.lod_view = view
+        self.profiler.count("artistas", len(self.lod_artists))
     
     def toggle_rotation(self):
         if self.rotating:
@@ -196,27 +732,193 @@ class FractalCubeApp:
     def start_rotation(self):
         if not self.rotating:
             self.rotating = True
-            self.rotate_cube()
+            if self.fast_view.get() and self.show_viewport():
+                self.rotate_viewport()
+            else:
+                self.rotate_cube()
     
     def stop_rotation(self):
         if self.rotating:
             self.root.after_cancel(self.rotation_id)
             self.rotating = False
+            if self.fast_rotation:
+                self.hide_viewport()
     
     def rotate_cube(self):
-        self.ax.view_init(elev=30, azim=self.ax.azim + 1)
-        self.canvas.draw()
-        self.rotation_id = self.root.after(50, self.rotate_cube)
+        self.profiler.frame("rotate_cube")
+        self.ax.view_init(elev=30, azim=self.ax.azim + ROTATION_STEP)
+        self.update_lod()
+        self.draw_canvas()
+        self.rotation_id = self.root.after(ROTATION_MS, self.rotate_cube)
+    
+    def show_viewport(self):
+        """Sustituye el canvas por el visor rápido; no hace nada si aún no hay un cubo generado"""
+        if self.shown is None:
+            return False
+        if self.viewport is None:
+            levels, mesh, colors, options = self.shown
+            with self.profiler.timer("visor"):
+                self.viewport = cube_viewport(levels, colors=colors, mesh=mesh, **options)
+        widget = self.canvas.get_tk_widget()
+        self.view_size = (widget.winfo_width(), widget.winfo_height())
+        self.view_label.pack(side=tk.TOP, fill=tk.BOTH, expand=True, before=widget)
+        widget.pack_forget()
+        self.fast_rotation = True
+        return True
+    
+    def hide_viewport(self):
+        """Vuelve al canvas de matplotlib con la vista en la que se paró el visor rápido"""
+        widget = self.canvas.get_tk_widget()
+        widget.pack(side=tk.TOP, fill=tk.BOTH, expand=True, before=self.view_label)
+        self.view_label.pack_forget()
+        self.fast_rotation = False
+        self.update_lod()
+        self.draw_canvas()
+    
+    def rotate_viewport(self):
+        """Gira el cubo en el visor rápido: cada fotograma se pinta con NumPy, sin mplot3d.
+        
+        La espera hasta el siguiente fotograma descuenta lo que ha tardado este,
+        así que la velocidad de giro es la de rotate_cube.
+        """
+        start = time.perf_counter()
+        self.profiler.frame("rotate_viewport")
+        self.ax.view_init(elev=30, azim=self.ax.azim + ROTATION_STEP)
+        with self.profiler.timer("visor"):
+            image = self.viewport.render(*self.view_size, elev=30, azim=self.ax.azim)
+            self.photo.configure(data=to_ppm(image), format="PPM")
+        elapsed = int((time.perf_counter() - start) * 1000)
+        self.rotation_id = self.root.after(max(1, ROTATION_MS - elapsed), self.rotate_viewport)
     
     def on_close(self):
+        self.cancel_generation()
+        self.cancel_movie()
         self.stop_rotation()
         plt.close('all')
         self.root.destroy()
 
 def run_app():
+    load_gui()
     root = tk.Tk()
     app = FractalCubeApp(root)
     root.mainloop()
 
+def render_main(args):
+    """Renderiza una o varias configuraciones a imágenes con el backend Agg"""
+    defaults = {
+        "depth": args.depth,
+        "color_mode": args.color_mode,
+        "draw_diagonals": not args.no_diagonals,
+        "draw_edges": not args.no_edges,
+        "draw_faces": args.faces,
+        "elev": args.elev,
+        "azim": args.azim,
+        "workers": args.workers,
+        "split_depth": args.split_depth,
+        "lod": args.lod,
+        "opaque": args.opaque,
+    }
+    if args.input:
+        defaults["data"] = open_fractal(args.input)
+    profiler = Profiler() if args.profile else NULL_PROFILER
+    if args.sweep:
+        jobs = [(output_path(args.out, name), {**defaults, **params})
+                for name, params in load_sweep(args.sweep)]
+    else:
+        jobs = [(args.out, defaults)]
+
+    # Una sola figura y una sola caché de geometría para todas las imágenes
+    fig, ax = agg_figure((args.size / args.dpi, args.size / args.dpi), args.dpi, projection='3d')
+    cache = GeometryCache(cache_dir=args.cache_dir)
+    for path, params in jobs:
+        if args.raster:
+            # Directo a la imagen con el visor rápido, sin mplot3d
+            from matplotlib.image import imsave
+            imsave(path, render_cube_image(args.size, cache=cache, profiler=profiler, **params))
+        else:
+            ax.clear()
+            render_cube(ax, cache=cache, profiler=profiler, **params)
+            with profiler.timer("savefig"):
+                fig.savefig(path)
+        print(path)
+    if args.profile:
+        profiler.export_trace(args.profile)
+
+def export_main(args):
+    """Genera el cubo y lo guarda en el formato que indique la extensión de --out"""
+    export_fractal(args.out, args.depth, args.color_mode, GeometryCache(cache_dir=args.cache_dir),
+                   not args.no_diagonals, not args.no_edges, args.faces)
+    print(args.out)
+
+def movie_main(args):
+    """Guarda una vuelta completa del cubo en el .gif o .mp4 de --out"""
+    frames = iter_export_rotation(args.out, args.depth, args.frames, args.size, args.fps, args.elev, args.azim,
+                                  args.color_mode, not args.no_diagonals, not args.no_edges, args.faces,
+                                  args.opaque, args.workers, GeometryCache(cache_dir=args.cache_dir))
+    for count in frames:
+        print(f"\r{count}/{args.frames}", end="", flush=True)
+    print(f"\r{args.out}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generador de cubos fractales 3D")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("gui", help="abre la interfaz gráfica (por defecto)")
+
+    render = commands.add_parser("render", help="renderiza sin ventana a archivos de imagen")
+    render.add_argument("--depth", type=int, default=3)
+    render.add_argument("--color-mode", choices=["Niveles", "Único", "Aleatorio"], default="Niveles")
+    render.add_argument("--no-diagonals", action="store_true")
+    render.add_argument("--no-edges", action="store_true")
+    render.add_argument("--faces", action="store_true")
+    render.add_argument("--elev", type=float, default=30)
+    render.add_argument("--azim", type=float, default=45)
+    render.add_argument("--workers", type=int, help="procesos para generar la geometría en paralelo")
+    render.add_argument("--split-depth", type=int, help="nivel en el que se reparten los subárboles entre procesos")
+    render.add_argument("--lod", action="store_true", help="subdivide solo los cubos que se distinguen en la imagen")
+    render.add_argument("--opaque", action="store_true", help="caras opacas: omite la geometría oculta")
+    render.add_argument("--raster", action="store_true", help="pinta el cubo directamente en la imagen, sin mplot3d")
+    render.add_argument("--cache-dir", help="directorio donde guardar y reutilizar la geometría (.npz)")
+    render.add_argument("--size", type=int, default=800, help="tamaño de la imagen en píxeles")
+    render.add_argument("--dpi", type=int, default=100)
+    render.add_argument("--profile", metavar="TRAZA", help="guarda los tiempos de cada fase como traza de Chrome (.json)")
+    render.add_argument("--input", help="dibuja la geometría de un archivo .fractal en lugar de generarla")
+    render.add_argument("--sweep", help="JSON con varias configuraciones; --out pasa a ser un directorio")
+    render.add_argument("--out", default="cubo_fractal.png")
+
+    export = commands.add_parser("export", help="guarda la geometría en un archivo .fractal, .obj o .stl")
+    export.add_argument("--depth", type=int, default=3)
+    export.add_argument("--color-mode", choices=["Niveles", "Único", "Aleatorio"], default="Niveles")
+    export.add_argument("--no-diagonals", action="store_true")
+    export.add_argument("--no-edges", action="store_true")
+    export.add_argument("--faces", action="store_true", help="incluye las caras en el OBJ (el STL solo tiene caras)")
+    export.add_argument("--cache-dir", help="directorio donde guardar y reutilizar la geometría (.npz)")
+    export.add_argument("--out", default="cubo_fractal.fractal")
+
+    movie = commands.add_parser("movie", help="guarda una vuelta completa del cubo en un .gif o .mp4 (con ffmpeg)")
+    movie.add_argument("--depth", type=int, default=3)
+    movie.add_argument("--color-mode", choices=["Niveles", "Único", "Aleatorio"], default="Niveles")
+    movie.add_argument("--no-diagonals", action="store_true")
+    movie.add_argument("--no-edges", action="store_true")
+    movie.add_argument("--faces", action="store_true")
+    movie.add_argument("--opaque", action="store_true", help="caras opacas: omite la geometría oculta")
+    movie.add_argument("--elev", type=float, default=30)
+    movie.add_argument("--azim", type=float, default=45, help="ángulo del primer fotograma")
+    movie.add_argument("--frames", type=int, default=360, help="fotogramas de la vuelta completa")
+    movie.add_argument("--fps", type=float, default=1000 / ROTATION_MS)
+    movie.add_argument("--size", type=int, default=600, help="tamaño de los fotogramas en píxeles")
+    movie.add_argument("--workers", type=int, help="procesos para pintar y codificar los fotogramas")
+    movie.add_argument("--cache-dir", help="directorio donde guardar y reutilizar la geometría (.npz)")
+    movie.add_argument("--out", default="cubo_fractal.gif")
+
+    args = parser.parse_args(argv)
+    if args.command == "render":
+        render_main(args)
+    elif args.command == "export":
+        export_main(args)
+    elif args.command == "movie":
+        movie_main(args)
+    else:
+        run_app()
+
 if __name__ == "__main__":
-    run_app()
\ No newline at end of file
+    main()
\ No newline at end of file
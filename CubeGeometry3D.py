@@ -0,0 +1,391 @@
+import numpy as np
+from FractalParallel import expand_levels, expand_points, iter_level_ranges
+
+# Vértices de un cubo unitario, en el mismo orden que el dibujo original (FractalBenchmarks.legacy_draw_cube)
+CUBE_CORNERS = np.array([
+    [0, 0, 0],
+    [1, 0, 0],
+    [1, 1, 0],
+    [0, 1, 0],
+    [0, 0, 1],
+    [1, 0, 1],
+    [1, 1, 1],
+    [0, 1, 1]
+], dtype=float)
+
+# Aristas, diagonales y caras expresadas como índices sobre CUBE_CORNERS. Los
+# vértices de cada cara giran en sentido antihorario vistos desde fuera, así que
+# su normal (regla de la mano derecha) apunta hacia fuera del cubo
+CUBE_EDGES = np.array([
+    [0, 1], [1, 2], [2, 3], [3, 0],
+    [4, 5], [5, 6], [6, 7], [7, 4],
+    [0, 4], [1, 5], [2, 6], [3, 7]
+])
+CUBE_DIAGONALS = np.array([[0, 6], [1, 7]])
+CUBE_FACES = np.array([
+    [0, 3, 2, 1],  # abajo
+    [4, 5, 6, 7],  # arriba
+    [0, 1, 5, 4],  # frente
+    [2, 3, 7, 6],  # atrás
+    [1, 2, 6, 5],  # derecha
+    [0, 4, 7, 3]   # izquierda
+])
+
+# Desplazamientos de los 8 subcubos, en el orden i, j, k de legacy_draw_cube
+CHILD_OFFSETS = np.array([[i, j, k] for i in (0, 1) for j in (0, 1) for k in (0, 1)], dtype=float)
+
+
+class CubeLevels:
+    """Geometría de un cubo fractal almacenada nivel a nivel como arrays de NumPy.
+
+    ``origins[d]`` es un array (N, 3) con los orígenes de los cubos del nivel d y
+    ``sizes[d]`` un array (N,) con sus tamaños. Los 8 hijos del cubo p del nivel d
+    ocupan las posiciones 8*p ... 8*p+7 del nivel d+1.
+    """
+
+    def __init__(self, origins, sizes):
+        self.origins = origins
+        self.sizes = sizes
+
+    @property
+    def max_depth(self):
+        return len(self.origins) - 1
+
+    def counts(self):
+        """Número de cubos en cada nivel"""
+        return [len(level) for level in self.origins]
+
+    def __len__(self):
+        return sum(self.counts())
+
+    @property
+    def nbytes(self):
+        return sum(level.nbytes for level in self.origins)
+
+    def truncated(self, max_depth):
+        """Niveles 0..max_depth, compartiendo los arrays sin copiarlos"""
+        return CubeLevels(self.origins[:max_depth + 1], self.sizes[:max_depth + 1])
+
+    def _deeper(self, max_depth):
+        """Tamaños y desplazamientos de los hijos de los niveles que faltan hasta ``max_depth``"""
+        level_sizes = [self.sizes[-1][0] / 2**depth for depth in range(1, max_depth - self.max_depth + 1)]
+        offsets = CHILD_OFFSETS.astype(self.origins[-1].dtype)
+        return level_sizes, [s * offsets for s in level_sizes]
+
+    def extended(self, max_depth, workers=None, split_depth=None):
+        """Añade niveles hasta ``max_depth`` subdividiendo el último nivel existente"""
+        level_sizes, displacements = self._deeper(max_depth)
+        new = expand_levels(self.origins[-1], displacements, workers, split_depth)[1:]
+
+        # Todos los cubos de un nivel tienen el mismo tamaño
+        sizes = [np.broadcast_to(s, (len(o),)) for s, o in zip(level_sizes, new)]
+        return CubeLevels(self.origins + new, self.sizes + sizes)
+
+    def iter_levels(self, max_depth=None):
+        """Produce (nivel, orígenes, tamaños) nivel a nivel.
+
+        Con ``max_depth`` mayor que la profundidad calculada, los niveles que
+        faltan se generan sobre la marcha conservando solo el anterior.
+        """
+        max_depth = self.max_depth if max_depth is None else max_depth
+        for depth in range(min(max_depth, self.max_depth) + 1):
+            yield depth, self.origins[depth], self.sizes[depth]
+
+        origins = self.origins[-1]
+        level_sizes, displacements = self._deeper(max_depth)
+        for depth, (size, displacement) in enumerate(zip(level_sizes, displacements), self.max_depth + 1):
+            origins = expand_points(origins, displacement)
+            yield depth, origins, np.broadcast_to(size, (len(origins),))
+
+    def iter_chunks(self, max_depth=None, max_elements=65536):
+        """Produce (nivel, inicio, orígenes, tamaños) en bloques de como máximo ``max_elements`` cubos.
+
+        El recorrido es en anchura y los niveles que faltan hasta ``max_depth`` se
+        generan bloque a bloque, así que la memoria no depende de la profundidad.
+        """
+        max_depth = self.max_depth if max_depth is None else max_depth
+        level_sizes, displacements = self._deeper(max_depth)
+        level_sizes = [s[0] for s in self.sizes] + level_sizes
+        for depth, start, origins in iter_level_ranges(self.origins, displacements, max_depth, max_elements):
+            yield depth, start, origins, np.broadcast_to(level_sizes[depth], (len(origins),))
+
+    def to_arrays(self):
+        """Arrays planos para guardar la geometría en un archivo .npz"""
+        return {
+            "kind": np.array("cube"),
+            "origins": np.concatenate(self.origins),
+            "counts": np.array(self.counts()),
+            "level_sizes": np.array([s[0] for s in self.sizes]),
+        }
+
+    @classmethod
+    def from_arrays(cls, data):
+        """Reconstruye los niveles a partir de los arrays de to_arrays()"""
+        origins = np.split(data["origins"], np.cumsum(data["counts"])[:-1])
+        sizes = [np.broadcast_to(s, (len(o),)) for s, o in zip(data["level_sizes"], origins)]
+        return cls(origins, sizes)
+
+    def _select(self, depth):
+        if depth is None:
+            return np.concatenate(self.origins), np.concatenate(self.sizes)
+        return self.origins[depth], self.sizes[depth]
+
+    def _expand(self, corner_index, depth):
+        """Aplica una tabla de índices sobre CUBE_CORNERS a todos los cubos seleccionados"""
+        origins, sizes = self._select(depth)
+        template = CUBE_CORNERS[corner_index].astype(origins.dtype)
+        points = origins[:, None, None, :] + sizes[:, None, None, None] * template
+        return points.reshape(-1, template.shape[1], 3)
+
+    def vertices(self, depth=None):
+        """Vértices de cada cubo como array (N, 8, 3)"""
+        return self._expand(np.arange(8)[None], depth)
+
+    def edges(self, depth=None):
+        """Aristas de todos los cubos como segmentos (N*12, 2, 3)"""
+        return self._expand(CUBE_EDGES, depth)
+
+    def diagonals(self, depth=None):
+        """Diagonales principales de todos los cubos como segmentos (N*2, 2, 3)"""
+        return self._expand(CUBE_DIAGONALS, depth)
+
+    def faces(self, depth=None):
+        """Caras de todos los cubos como cuadriláteros (N*6, 4, 3)"""
+        return self._expand(CUBE_FACES, depth)
+
+
+class CubeLattice:
+    """Rejilla entera en la que caen todas las esquinas de los cubos.
+
+    Los orígenes de cada nivel son múltiplos de ``size / 2**depth`` desde el
+    origen del cubo raíz, así que con el paso del nivel más profundo cada
+    esquina tiene coordenadas enteras y se identifica por una clave int64.
+    """
+
+    def __init__(self, low, step, side):
+        self.low = low
+        self.step = step
+        self.side = side
+
+    @classmethod
+    def of(cls, levels, max_depth=None):
+        """Rejilla de ``levels`` con el paso de los cubos del nivel ``max_depth`` (por defecto, el último)"""
+        max_depth = levels.max_depth if max_depth is None else max_depth
+        depth = next(d for d, level in enumerate(levels.origins) if len(level))
+        origins, size = levels.origins[depth], levels.sizes[depth][0]
+        step = size / 2**(max_depth - depth)
+        low = origins.min(axis=0)
+        side = int(round((origins.max(axis=0) - low).max() / step)) + 2**(max_depth - depth) + 1
+        return cls(low, step, side)
+
+    def keys(self, points):
+        """Clave entera de cada punto (..., 3) de la rejilla"""
+        grid = np.rint((points - self.low) / self.step).astype(np.int64)
+        return (grid[..., 0] * self.side + grid[..., 1]) * self.side + grid[..., 2]
+
+    def grid(self, keys):
+        """Coordenadas enteras (..., 3) de los puntos a partir de sus claves"""
+        return np.stack([keys // self.side**2, keys // self.side % self.side, keys % self.side], axis=-1)
+
+    def points(self, keys):
+        """Coordenadas de los puntos a partir de sus claves"""
+        return self.low + self.grid(keys) * self.step
+
+    def on_surface(self, keys):
+        """Marca los elementos (K, m) apoyados en una cara de la caja que cubre la rejilla"""
+        grid = self.grid(keys)
+        edge = self.side - 1
+        return np.any(np.all(grid == 0, axis=1) | np.all(grid == edge, axis=1), axis=1)
+
+    def pair_keys(self, keys):
+        """Clave de cada elemento (K, m) alineado con los ejes a partir de sus esquinas opuestas.
+
+        Con claves crecientes en x, y, z, los vértices de clave mínima y máxima
+        son las esquinas opuestas, que bastan para identificar una arista o una cara.
+        """
+        return keys.min(axis=1) * self.side**3 + keys.max(axis=1)
+
+
+class CubeMesh:
+    """Malla indexada de un cubo fractal: cada vértice, arista y cara aparece una sola vez.
+
+    ``vertices`` (V, 3) son las esquinas distintas; ``edges`` (E, 2),
+    ``diagonals`` (D, 2) y ``faces`` (F, 4) son índices sobre ``vertices``. Las
+    aristas que comparten cubos vecinos se guardan una vez. Como cada nivel
+    llena el cubo raíz, las hojas (por defecto, los cubos del último nivel)
+    bastan para todo: sus aristas cubren las de los cubos mayores y las caras
+    son las suyas que están sobre la superficie exterior, una sola capa sin las
+    superficies de los niveles anteriores superpuestas. Los arrays ``*_owners``
+    dan el cubo (en el orden de los niveles concatenados) del que sale cada
+    elemento, para tomar su color o su profundidad.
+    """
+
+    def __init__(self, vertices, edges, edge_owners, diagonals, diagonal_owners, faces, face_owners):
+        self.vertices = vertices
+        self.edges = edges
+        self.edge_owners = edge_owners
+        self.diagonals = diagonals
+        self.diagonal_owners = diagonal_owners
+        self.faces = faces
+        self.face_owners = face_owners
+
+    @classmethod
+    def from_levels(cls, levels, faces=True, leaves=None, level_edges=False):
+        """Construye la malla de los niveles; con ``faces`` False no se calculan las caras.
+
+        ``leaves`` son las máscaras por nivel de los cubos no subdivididos (ver
+        refine_view); por defecto, el último nivel. Como los hijos llenan a su
+        padre, las aristas y diagonales de las hojas cubren las de los cubos
+        mayores, así que solo se guardan las de las hojas. Con ``level_edges``
+        se guardan también las de los niveles anteriores, para los modos de
+        color en los que cada nivel tiene su color y sus aristas se distinguen.
+        """
+        origins, sizes = levels._select(None)
+        if leaves is None:
+            owners = np.arange(len(origins) - levels.counts()[-1], len(origins))
+        else:
+            owners = np.flatnonzero(np.concatenate(leaves))
+        cubes = np.arange(len(origins)) if level_edges else owners
+        lattice = CubeLattice.of(levels)
+        keys = lattice.keys(origins[cubes][:, None, :] + sizes[cubes][:, None, None] * CUBE_CORNERS)
+        unique, ids = np.unique(keys.reshape(-1), return_inverse=True)
+        # np.unique ordena las claves, así que los índices conservan el orden de la rejilla
+        ids = ids.reshape(keys.shape)
+
+        edges = ids[:, CUBE_EDGES].reshape(-1, 2)
+        edge_owners = np.repeat(cubes, len(CUBE_EDGES))
+        _, first = np.unique(lattice.pair_keys(edges), return_index=True)
+        first.sort()
+        edges, edge_owners = edges[first], edge_owners[first]
+
+        diagonals = ids[:, CUBE_DIAGONALS].reshape(-1, 2)
+        diagonal_owners = np.repeat(cubes, len(CUBE_DIAGONALS))
+
+        if faces:
+            # Posición de cada hoja entre los cubos de la malla (los dos están ordenados)
+            leaf = np.searchsorted(cubes, owners)
+            faces = ids[leaf][:, CUBE_FACES].reshape(-1, 4)
+            face_owners = np.repeat(owners, len(CUBE_FACES))
+            outside = lattice.on_surface(keys[leaf][:, CUBE_FACES].reshape(-1, 4))
+            faces, face_owners = faces[outside], face_owners[outside]
+        else:
+            faces, face_owners = np.empty((0, 4), dtype=np.intp), np.empty(0, dtype=np.intp)
+        return cls(lattice.points(unique), edges, edge_owners, diagonals, diagonal_owners, faces, face_owners)
+
+    def edge_segments(self):
+        """Aristas como segmentos (E, 2, 3)"""
+        return self.vertices[self.edges]
+
+    def diagonal_segments(self):
+        """Diagonales como segmentos (D, 2, 3)"""
+        return self.vertices[self.diagonals]
+
+    def face_polygons(self):
+        """Caras como cuadriláteros (F, 4, 3)"""
+        return self.vertices[self.faces]
+
+
+def generate_cube_levels(max_depth, origin=(0, 0, 0), size=10, dtype=np.float64, workers=None, split_depth=None):
+    """Genera todos los niveles del cubo fractal sin recursión ni interfaz gráfica.
+
+    Con ``workers`` > 1 los octantes por debajo de ``split_depth`` se generan en
+    paralelo en varios procesos.
+    """
+    root = CubeLevels([np.asarray(origin, dtype=dtype).reshape(1, 3)], [np.full(1, size, dtype=dtype)])
+    return root.extended(max_depth, workers, split_depth)
+
+
+def view_direction(elev, azim):
+    """Vector unitario hacia el observador para una vista (elev, azim) de mplot3d, en grados"""
+    elev, azim = np.radians([elev, azim])
+    return np.array([np.cos(elev) * np.cos(azim), np.cos(elev) * np.sin(azim), np.sin(elev)])
+
+
+def refine_view(project, viewport, max_depth, origin=(0, 0, 0), size=10, pixel_threshold=4, limits=None,
+                max_cubes=None, eye=None):
+    """Selecciona los cubos a dibujar según su tamaño en pantalla.
+
+    ``project`` lleva puntos (N, 3) a píxeles (N, 2) con la vista actual y
+    ``viewport`` es el rectángulo (x0, y0, x1, y1) visible en píxeles. Se
+    descartan los cubos fuera de la pantalla o de la caja ``limits`` (lo, hi),
+    y solo se subdividen los que miden al menos ``pixel_threshold`` píxeles.
+    ``max_cubes`` limita el total de cubos visitados: si subdividir todos los
+    candidatos de un nivel lo superaría, se subdividen los que se ven más
+    grandes y el resto se quedan como hojas. Con ``eye`` (caras opacas vistas
+    desde esa dirección) solo se visitan los cubos que tocan la superficie del
+    cubo raíz orientada hacia la cámara, que son los únicos que se ven.
+    Devuelve los cubos visitados como CubeLevels y, por nivel, una máscara de
+    los que no se han subdividido (hojas).
+    """
+    x0, y0, x1, y1 = viewport
+    origins = np.asarray(origin, dtype=float).reshape(1, 3)
+    size = float(size)
+    root_lo, root_hi = origins[0], origins[0] + size
+    visited, sizes, leaves = [], [], []
+    total = 0
+
+    for depth in range(max_depth + 1):
+        if limits is not None:
+            lo, hi = limits
+            origins = origins[np.all((origins < hi) & (origins + size > lo), axis=1)]
+
+        corners = project((origins[:, None, :] + size * CUBE_CORNERS).reshape(-1, 3)).reshape(-1, 8, 2)
+        low, high = corners.min(axis=1), corners.max(axis=1)
+        on_screen = (high[:, 0] >= x0) & (low[:, 0] <= x1) & (high[:, 1] >= y0) & (low[:, 1] <= y1)
+        origins, extent = origins[on_screen], (high - low)[on_screen].max(axis=1)
+
+        leaf = (extent < pixel_threshold) | (depth == max_depth)
+        total += len(origins)
+        children = expand_points(origins[~leaf], size / 2 * CHILD_OFFSETS)
+        parents = np.repeat(np.flatnonzero(~leaf), len(CHILD_OFFSETS))
+        if eye is not None:
+            front = touches_front(children, size / 2, eye, root_lo, root_hi)
+            children, parents = children[front], parents[front]
+
+        if max_cubes is not None and total + len(children) > max_cubes:
+            # Se subdividen primero los cubos más grandes en pantalla, mientras quepan sus hijos
+            candidates = np.flatnonzero(~leaf)
+            candidates = candidates[np.argsort(-extent[candidates], kind="stable")]
+            room = np.cumsum(np.bincount(parents, minlength=len(origins))[candidates]) <= max_cubes - total
+            leaf[candidates[~room]] = True
+            keep = ~leaf[parents]
+            children, parents = children[keep], parents[keep]
+
+        visited.append(origins)
+        sizes.append(np.broadcast_to(size, (len(origins),)))
+        leaves.append(leaf)
+        if leaf.all():
+            break
+
+        size /= 2
+        origins = children
+
+    return CubeLevels(visited, sizes), leaves
+
+
+def touches_front(origins, size, eye, lo, hi):
+    """Marca los cubos (N, 3) de lado ``size`` que tocan una cara de la caja [lo, hi] orientada hacia ``eye``"""
+    mask = np.zeros(len(origins), dtype=bool)
+    tolerance = 1e-9 * float(np.max(hi - lo))
+    for axis in range(3):
+        if eye[axis] > 0:
+            mask |= origins[:, axis] + size >= hi[axis] - tolerance
+        elif eye[axis] < 0:
+            mask |= origins[:, axis] <= lo[axis] + tolerance
+    return mask
+
+
+def front_surface_mask(points, eye, lo, hi):
+    """Marca los elementos (N, k, 3) apoyados en una cara de la caja [lo, hi] orientada hacia ``eye``.
+
+    Como los cubos de cada nivel llenan el cubo raíz, con caras opacas solo se
+    ven las aristas y caras que están sobre su superficie exterior visible.
+    """
+    mask = np.zeros(len(points), dtype=bool)
+    tolerance = 1e-9 * float(np.max(hi - lo))
+    for axis in range(3):
+        if eye[axis] == 0:
+            continue
+        plane = hi[axis] if eye[axis] > 0 else lo[axis]
+        mask |= np.all(np.abs(points[:, :, axis] - plane) <= tolerance, axis=1)
+    return mask
@@ -0,0 +1,211 @@
+import numpy as np
+
+from CubeGeometry3D import view_direction
+
+# Color de las caras, como en draw_cube_levels: relleno cian (transparente salvo
+# con caras opacas) y contorno azul
+FACE_COLOR = (0, 255, 255, 255)
+FACE_EDGE_COLOR = (0, 0, 255, 255)
+FACE_ALPHA = 0.1
+
+
+def pack_colors(colors):
+    """Colores RGBA (N, 4) como enteros uint32, uno por píxel de la imagen.
+
+    Los colores de coma flotante van de 0 a 1 (como los de matplotlib) y los enteros, de 0 a 255.
+    """
+    colors = np.asarray(colors)
+    if np.issubdtype(colors.dtype, np.floating):
+        colors = np.round(colors * 255)
+    colors = colors.astype(np.uint8)
+    return np.ascontiguousarray(colors.reshape(-1, 4)).view(np.uint32).reshape(-1)
+
+
+def view_matrix(elev, azim, center, radius, width, height, margin=2):
+    """Matriz 4x4 que lleva puntos homogéneos a (x, y) en píxeles y profundidad.
+
+    Proyección ortográfica con la misma orientación que view_init(elev, azim)
+    de mplot3d. La escala hace caber la esfera de ``radius`` alrededor de
+    ``center`` en la imagen, así que nada de lo proyectado queda fuera.
+    """
+    eye = view_direction(elev, azim)
+    elev, azim = np.radians([elev, azim])
+    right = np.array([-np.sin(azim), np.cos(azim), 0])
+    up = np.array([-np.sin(elev) * np.cos(azim), -np.sin(elev) * np.sin(azim), np.cos(elev)])
+    scale = max(min(width, height) / 2 - margin, 0) / radius
+
+    matrix = np.eye(4)
+    matrix[0, :3] = scale * right
+    matrix[1, :3] = -scale * up
+    matrix[2, :3] = eye
+    matrix[:3, 3] = np.array([width / 2, height / 2, 0]) - matrix[:3, :3] @ center
+    return matrix
+
+
+def segment_stencil(d, width):
+    """Desplazamientos (en índices planos de la imagen) de los píxeles de un segmento de vector ``d``"""
+    steps = int(np.ceil(np.abs(d).max())) + 1
+    points = np.rint(np.linspace(0, 1, steps)[:, None] * d).astype(np.int32)
+    return points[:, 1] * width + points[:, 0]
+
+
+def parallelogram_stencil(u, v, width):
+    """Desplazamientos de los píxeles dentro del paralelogramo de lados ``u`` y ``v``.
+
+    Las caras que se ven de canto o miden menos de un píxel se reducen a su esquina.
+    """
+    det = u[0] * v[1] - u[1] * v[0]
+    if abs(det) < 1:
+        return np.zeros(1, dtype=np.int32)
+    corners = np.array([[0, 0], u, v, u + v])
+    low, high = np.floor(corners.min(axis=0)).astype(int), np.ceil(corners.max(axis=0)).astype(int)
+    ys, xs = np.mgrid[low[1]:high[1] + 1, low[0]:high[0] + 1]
+    a = (xs * v[1] - ys * v[0]) / det
+    b = (u[0] * ys - u[1] * xs) / det
+    inside = (a >= 0) & (a < 1) & (b >= 0) & (b < 1)
+    return (ys[inside] * width + xs[inside]).astype(np.int32)
+
+
+def surface_sides(points, low, high):
+    """Bits de las caras de la caja [low, high] sobre las que se apoya cada elemento (N, k, 3).
+
+    El bit ``2*eje`` corresponde a la cara inferior de ese eje y ``2*eje + 1`` a la superior.
+    """
+    tolerance = 1e-9 * float(np.max(high - low))
+    sides = np.zeros(len(points), dtype=np.uint8)
+    for axis in range(3):
+        sides |= np.all(np.abs(points[:, :, axis] - low[axis]) <= tolerance, axis=1).astype(np.uint8) << 2*axis
+        sides |= np.all(np.abs(points[:, :, axis] - high[axis]) <= tolerance, axis=1).astype(np.uint8) << 2*axis + 1
+    return sides
+
+
+def visible_sides(eye):
+    """Bits (ver surface_sides) de las caras de la caja orientadas hacia ``eye``"""
+    bits = 0
+    for axis in range(3):
+        if eye[axis] != 0:
+            bits |= 1 << 2*axis + (eye[axis] > 0)
+    return bits
+
+
+def element_groups(vertices, elements, colors, low, high):
+    """Agrupa elementos (N, k) por la forma de sus lados: (lados 3D, primer vértice, colores, caras de la caja).
+
+    Con proyección ortográfica todos los elementos de un grupo se proyectan con
+    la misma forma, así que en cada fotograma basta una plantilla por grupo.
+    Los grupos se devuelven en el orden de su primer elemento.
+    """
+    corners = vertices[elements]
+    shape = np.round(corners[:, 1:] - corners[:, :1], 9).reshape(len(elements), -1)
+    _, first, inverse = np.unique(shape, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    sides = surface_sides(corners, low, high)
+    groups = []
+    for g in np.argsort(first):
+        members = np.flatnonzero(inverse == g)
+        groups.append((corners[first[g], 1:] - corners[first[g], 0], elements[members, 0],
+                       colors[members], sides[members]))
+    return groups
+
+
+class CubeViewport:
+    """Visor del cubo fractal que pinta cada fotograma directamente en una imagen RGBA de NumPy.
+
+    Alternativa a mplot3d para girar el cubo: los vértices de la CubeMesh se
+    proyectan con una sola multiplicación por una matriz 4x4 y cada grupo de
+    aristas o caras con la misma forma se pinta con una plantilla de píxeles
+    (ver element_groups), sin crear artistas ni recorrer elementos en Python.
+    Las caras son la superficie exterior del cubo raíz (ver CubeMesh) y tienen
+    todas el mismo color, así que se componen sin ordenarlas por profundidad:
+    como la superficie es cerrada y convexa, cada píxel que cubre una cara
+    delantera tiene detrás exactamente una trasera. Solo se pintan las
+    delanteras, opacas o con el color de dos capas transparentes mezcladas
+    sobre el fondo. Con ``opaque`` tampoco se pinta ninguna línea que no esté
+    en la superficie orientada hacia la cámara.
+    """
+
+    def __init__(self, mesh, palette, color_index, draw_diagonals=True, draw_edges=True, draw_faces=False,
+                 opaque=False, background=(255, 255, 255, 255)):
+        self.opaque = opaque
+        self.background = pack_colors(background)[0]
+        self.face_color = pack_colors(FACE_COLOR if opaque else layer_color(background, 2))[0]
+        self.homogeneous = np.column_stack([mesh.vertices, np.ones(len(mesh.vertices))])
+        self.low, self.high = mesh.vertices.min(axis=0), mesh.vertices.max(axis=0)
+        self.center = (self.low + self.high) / 2
+        self.radius = np.linalg.norm(self.high - self.low) / 2
+        self.image = None
+
+        colors = pack_colors(palette)
+        build = lambda elements, element_colors: element_groups(mesh.vertices, elements, element_colors,
+                                                                self.low, self.high)
+        self.faces, self.lines = [], []
+        if draw_faces and len(mesh.faces):
+            self.faces = build(mesh.faces, np.zeros(len(mesh.faces), dtype=np.uint32))
+            # Los lados de las caras son aristas de los cubos más pequeños: con
+            # aristas, estas los pintarían encima de todos modos
+            if not draw_edges:
+                outlines = mesh.faces[:, [0, 1, 1, 2, 2, 3, 3, 0]].reshape(-1, 2)
+                self.lines += build(outlines, np.full(len(outlines), pack_colors(FACE_EDGE_COLOR)[0]))
+        if draw_edges:
+            self.lines += build(mesh.edges, colors[color_index[mesh.edge_owners]])
+        if draw_diagonals and not opaque:
+            self.lines += build(mesh.diagonals, colors[color_index[mesh.diagonal_owners]])
+
+    def __len__(self):
+        return sum(len(starts) for _, starts, _, _ in self.faces + self.lines)
+
+    def _buffer(self, width, height):
+        if self.image is None or self.image.shape[:2] != (height, width):
+            self.image = np.empty((height, width, 4), dtype=np.uint8)
+        return self.image
+
+    def render(self, width, height, elev=30, azim=45):
+        """Pinta el cubo visto desde (elev, azim) y devuelve la imagen (alto, ancho, 4) de uint8.
+
+        La imagen se reutiliza en el siguiente fotograma del mismo tamaño.
+        """
+        image = self._buffer(width, height)
+        pixels = image.reshape(-1, 4).view(np.uint32).reshape(-1)
+        pixels[:] = self.background
+
+        matrix = view_matrix(elev, azim, self.center, self.radius, width, height)
+        projected = self.homogeneous @ matrix.T
+        flat = np.rint(projected[:, 1]).astype(np.int32) * width + np.rint(projected[:, 0]).astype(np.int32)
+        linear = matrix[:2, :3]
+        front = visible_sides(view_direction(elev, azim))
+
+        def starts(group, cull):
+            _, first, _, sides = group
+            if not cull:
+                return flat[first], slice(None)
+            keep = (sides & front) != 0
+            return flat[first[keep]], keep
+
+        # Las caras delanteras, debajo de las líneas
+        if self.faces:
+            covered = []
+            for group in self.faces:
+                first, _ = starts(group, True)
+                sides = group[0]
+                covered.append((first[:, None] + parallelogram_stencil(linear @ sides[0], linear @ sides[2],
+                                                                       width)).reshape(-1))
+            pixels[np.concatenate(covered)] = self.face_color
+
+        for group in self.lines:
+            first, keep = starts(group, self.opaque)
+            indices = first[:, None] + segment_stencil(linear @ group[0][0], width)
+            pixels[indices] = group[2][keep][:, None]
+        return image
+
+
+def layer_color(background, layers):
+    """Color RGBA de ``layers`` caras transparentes (FACE_COLOR con FACE_ALPHA) superpuestas sobre ``background``"""
+    background = np.asarray(pack_colors(background)[:1].view(np.uint8), dtype=float)
+    alpha = 1 - (1 - FACE_ALPHA) ** layers
+    return np.rint(background * (1 - alpha) + np.array(FACE_COLOR) * alpha).astype(np.uint8)
+
+
+def to_ppm(image):
+    """Imagen RGBA (alto, ancho, 4) como PPM binario, que tk.PhotoImage carga sin más dependencias"""
+    height, width = image.shape[:2]
+    return b"P6 %d %d 255 " % (width, height) + np.ascontiguousarray(image[..., :3]).tobytes()
@@ -0,0 +1,45 @@
+import json
+import os
+import re
+
+
+def load_sweep(path):
+    """Lee un archivo JSON de configuraciones y devuelve una lista de pares (nombre, parámetros).
+
+    El archivo puede ser un diccionario {nombre: parámetros}, con el mismo formato
+    que ``AnimatedFractalGeneratorApp.presets``, o una lista de diccionarios con
+    una clave opcional "name".
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    if isinstance(data, dict):
+        return [(name, dict(params)) for name, params in data.items()]
+
+    jobs = []
+    for i, params in enumerate(data):
+        params = dict(params)
+        jobs.append((params.pop("name", f"fractal_{i:04d}"), params))
+    return jobs
+
+
+def slugify(name):
+    """Convierte el nombre de una configuración en un nombre de archivo seguro"""
+    return re.sub(r"[^\w.-]+", "_", name).strip("_") or "fractal"
+
+
+def output_path(out, name, ext=".png"):
+    """Ruta de salida de una configuración dentro del directorio ``out``"""
+    os.makedirs(out, exist_ok=True)
+    return os.path.join(out, slugify(name) + ext)
+
+
+def agg_figure(figsize, dpi=100, projection=None):
+    """Crea una figura con el backend Agg, sin pyplot ni ventanas, y sus ejes"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111, projection=projection)
+    return fig, ax
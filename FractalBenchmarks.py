@@ -0,0 +1,359 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import matplotlib
+import numpy as np
+from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+
+import CubeFractal3D
+import PolygonFractal2D
+from FractalBatch import agg_figure
+from FractalProfiler import NULL_PROFILER, ProfileOverlay
+
+# Las medidas más cortas que esto son sobre todo ruido y no se comparan con la referencia
+MIN_SECONDS = 1e-3
+
+
+class CapturedAnimation:
+    """Sustituto de FuncAnimation que guarda las funciones en lugar de arrancar un temporizador"""
+
+    def __init__(self, fig, func, frames=None, init_func=None, **kwargs):
+        self.func = func
+        self.frames = frames
+        self.init_func = init_func
+
+
+def measure(func, repeat=3, memory=True):
+    """Mejor tiempo de ``repeat`` ejecuciones y pico de memoria de una ejecución aparte.
+
+    La memoria se mide con tracemalloc en otra ejecución porque su coste
+    falsearía los tiempos.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    result = {"seconds": best}
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def legacy_draw_cube(ax, origin, size, depth, max_depth, draw_diagonals=True, draw_edges=True, draw_faces=False,
+                     color='b', color_mode="Niveles"):
+    """Dibujo recursivo original de FractalCubeApp, con un artista por arista: solo como referencia de las medidas"""
+    if depth > max_depth:
+        return
+
+    x, y, z = origin
+    s = size
+
+    # Define los 8 vértices del cubo
+    vertices = np.array([
+        [x, y, z],
+        [x+s, y, z],
+        [x+s, y+s, z],
+        [x, y+s, z],
+        [x, y, z+s],
+        [x+s, y, z+s],
+        [x+s, y+s, z+s],
+        [x, y+s, z+s]
+    ])
+
+    # Dibuja las aristas del cubo
+    if draw_edges:
+        edges = [
+            [vertices[0], vertices[1]],
+            [vertices[1], vertices[2]],
+            [vertices[2], vertices[3]],
+            [vertices[3], vertices[0]],
+            [vertices[4], vertices[5]],
+            [vertices[5], vertices[6]],
+            [vertices[6], vertices[7]],
+            [vertices[7], vertices[4]],
+            [vertices[0], vertices[4]],
+            [vertices[1], vertices[5]],
+            [vertices[2], vertices[6]],
+            [vertices[3], vertices[7]]
+        ]
+
+        for edge in edges:
+            ax.plot3D(*zip(*edge), color=color, linewidth=0.5)
+
+    # Dibuja las diagonales principales
+    if draw_diagonals:
+        # Diagonal principal (vértice 0 a vértice 6)
+        ax.plot([x, x+s], [y, y+s], [z, z+s], color=color, linewidth=1)
+        # Diagonal secundaria (vértice 1 a vértice 7)
+        ax.plot([x+s, x], [y, y+s], [z, z+s], color=color, linewidth=1)
+
+    # Dibuja las caras del cubo (opcional)
+    if draw_faces:
+        faces = [
+            [vertices[0], vertices[1], vertices[2], vertices[3]],  # abajo
+            [vertices[4], vertices[5], vertices[6], vertices[7]],  # arriba
+            [vertices[0], vertices[1], vertices[5], vertices[4]],  # frente
+            [vertices[2], vertices[3], vertices[7], vertices[6]],  # atrás
+            [vertices[1], vertices[2], vertices[6], vertices[5]],  # derecha
+            [vertices[0], vertices[3], vertices[7], vertices[4]]   # izquierda
+        ]
+
+        ax.add_collection3d(Poly3DCollection(faces,
+                                             facecolors='cyan',
+                                             linewidths=0.5,
+                                             edgecolors='blue',
+                                             alpha=0.1))
+
+    # Divide en 8 subcubos y aplica recursión
+    if depth < max_depth:
+        new_size = size / 2
+        for i in [0, 1]:
+            for j in [0, 1]:
+                for k in [0, 1]:
+                    new_origin = (x + i*new_size, y + j*new_size, z + k*new_size)
+                    # Cambia el color para niveles más profundos
+                    if color_mode == "Niveles":
+                        new_color = (color if depth < 2 else ['red', 'green', 'purple'][depth % 3])
+                    elif color_mode == "Aleatorio":
+                        new_color = np.random.choice(['red', 'green', 'blue', 'purple', 'orange'])
+                    else:
+                        new_color = color
+
+                    legacy_draw_cube(ax, new_origin, new_size, depth+1, max_depth,
+                                     draw_diagonals, draw_edges, draw_faces, new_color, color_mode)
+
+
+def polygon_app(fig, ax):
+    """AnimatedFractalGeneratorApp sin ventana, dibujando en una figura Agg"""
+    app = PolygonFractal2D.AnimatedFractalGeneratorApp.__new__(PolygonFractal2D.AnimatedFractalGeneratorApp)
+    app.fig, app.ax, app.canvas = fig, ax, fig.canvas
+    app.ani = None
+    app.profiler = NULL_PROFILER
+    app.overlay = ProfileOverlay(fig, app.profiler)
+    return app
+
+
+def bench_cubes(depths, repeat, memory, legacy_depth=4):
+    """legacy_draw_cube (la versión recursiva original), render_cube (vectorizado) y el visor rápido por profundidad.
+
+    legacy_draw_cube crea un artista por arista y tarda unas ocho veces más en cada
+    nivel, así que solo se mide hasta ``legacy_depth``; las profundidades mayores
+    quedan como ``{"skipped": True}``.
+    """
+    results = {}
+    fig, ax = agg_figure((8, 8), projection='3d')
+
+    for depth in depths:
+        def draw_cube():
+            ax.clear()
+            legacy_draw_cube(ax, (0, 0, 0), 10, 0, depth, draw_diagonals=True, draw_edges=True, draw_faces=False)
+
+        def render_cube():
+            ax.clear()
+            CubeFractal3D.render_cube(ax, depth)
+
+        if depth <= legacy_depth:
+            results[f"cube/draw_cube/d{depth}"] = measure(draw_cube, repeat, memory)
+        else:
+            results[f"cube/draw_cube/d{depth}"] = {"skipped": True}
+        results[f"cube/render_cube/d{depth}"] = measure(render_cube, repeat, memory)
+        results[f"cube/canvas_draw/d{depth}"] = measure(fig.canvas.draw, repeat, memory)
+
+        # Un fotograma de la rotación con el visor rápido (la malla se construye antes, al generar)
+        levels = CubeFractal3D.generate_cube_levels(depth)
+        viewport = CubeFractal3D.cube_viewport(levels)
+        results[f"cube/viewport_frame/d{depth}"] = measure(lambda: viewport.render(800, 800, azim=46), repeat, memory)
+    return results
+
+
+def bench_polygons(sides, depths, repeat, memory):
+    """Métodos prepare_* y el dibujado con draw_all_elements y canvas.draw()"""
+    results = {}
+    fig, ax = agg_figure((8, 8))
+    app = polygon_app(fig, ax)
+
+    for depth in depths:
+        results[f"polygon/prepare_sierpinski/d{depth}"] = measure(lambda: app.prepare_sierpinski(depth), repeat, memory)
+        results[f"polygon/prepare_carpet/d{depth}"] = measure(lambda: app.prepare_carpet(depth), repeat, memory)
+        for n in sides:
+            results[f"polygon/prepare_regular_fractal/s{n}/d{depth}"] = measure(
+                lambda: app.prepare_regular_fractal(n, depth, 0.5), repeat, memory)
+
+        def draw_all_elements():
+            ax.clear()
+            app.draw_all_elements()
+
+        # Dibujado de la última geometría generada (regular con más lados)
+        results[f"polygon/draw_all_elements/s{sides[-1]}/d{depth}"] = measure(draw_all_elements, repeat, memory)
+        results[f"polygon/canvas_draw/s{sides[-1]}/d{depth}"] = measure(fig.canvas.draw, repeat, memory)
+    return results
+
+
+def frame_samples(count, samples=5):
+    """Fotogramas repartidos entre el primero y el último de la animación"""
+    return sorted(set(np.linspace(0, count - 1, min(count, samples)).astype(int).tolist()))
+
+
+def bench_animation(depths, repeat, memory):
+    """Coste por fotograma de las dos animaciones de la alfombra, incluido canvas.draw()"""
+    results = {}
+    fig, ax = agg_figure((8, 8))
+    app = polygon_app(fig, ax)
+    # setup_animation crea un FuncAnimation: se sustituye mientras se mide y se restaura al terminar
+    saved, PolygonFractal2D.FuncAnimation = PolygonFractal2D.FuncAnimation, CapturedAnimation
+    try:
+        for depth in depths:
+            app.prepare_carpet(depth)
+
+            # setup_animation: cada fotograma vuelve a dibujar todos los elementos anteriores
+            app.setup_animation(4, depth, "carpet", 50)
+            frames = frame_samples(app.ani.frames)
+
+            def legacy_frames():
+                for frame in frames:
+                    app.ani.func(frame)
+                    fig.canvas.draw()
+
+            result = measure(legacy_frames, repeat, memory)
+            result["seconds"] /= len(frames)
+            results[f"animation/setup_animation/d{depth}"] = result
+
+            # IncrementalAnimation: cada paso añade y dibuja un solo bloque
+            def incremental_frames():
+                ax.clear()
+                fig.canvas.draw()
+                animation = PolygonFractal2D.IncrementalAnimation(fig, ax, app.all_elements, 50, per_frame=64)
+                steps = 0
+                while steps < 20:
+                    steps += 1
+                    if not animation.step():
+                        break
+                animation.event_source.stop()
+                return steps
+
+            steps = incremental_frames()
+            result = measure(incremental_frames, repeat, memory)
+            result["seconds"] /= steps
+            results[f"animation/incremental/d{depth}"] = result
+    finally:
+        PolygonFractal2D.FuncAnimation = saved
+    return results
+
+
+def run_benchmarks(cube_depths=range(1, 7), sides=range(3, 9), depths=range(1, 8),
+                   animation_depths=range(1, 4), repeat=3, memory=True, legacy_depth=4):
+    """Ejecuta todas las medidas y devuelve {nombre: {"seconds": ..., "peak_bytes": ...}} (o {"skipped": True})"""
+    results = {}
+    results.update(bench_cubes(list(cube_depths), repeat, memory, legacy_depth))
+    results.update(bench_polygons(list(sides), list(depths), repeat, memory))
+    results.update(bench_animation(list(animation_depths), repeat, memory))
+    return results
+
+
+def environment():
+    """Versiones y máquina con las que se tomaron las medidas"""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "matplotlib": matplotlib.__version__,
+        "machine": platform.machine(),
+        "system": platform.system(),
+    }
+
+
+def compare(results, baseline, threshold=0.25):
+    """Lista de (nombre, métrica, referencia, actual) que empeoran más de ``threshold`` respecto a la referencia.
+
+    Las medidas que la referencia tomó y ahora se han saltado aparecen con la
+    métrica "skipped", los segundos de la referencia y None como valor actual.
+    """
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if current.get("skipped"):
+            if not reference.get("skipped"):
+                regressions.append((name, "skipped", reference.get("seconds"), None))
+            continue
+        for metric in ("seconds", "peak_bytes"):
+            if metric not in current or metric not in reference:
+                continue
+            if metric == "seconds" and reference[metric] < MIN_SECONDS:
+                continue
+            if current[metric] > reference[metric] * (1 + threshold):
+                regressions.append((name, metric, reference[metric], current[metric]))
+    return regressions
+
+
+def parse_range(text):
+    """Convierte "1-6" o "3,5,8" en una lista de enteros"""
+    values = []
+    for part in text.split(","):
+        low, _, high = part.partition("-")
+        values.extend(range(int(low), int(high or low) + 1))
+    return values
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Medidas de rendimiento de los generadores de fractales")
+    parser.add_argument("--out", default="benchmark_results.json", help="JSON donde escribir los resultados")
+    parser.add_argument("--baseline", default="benchmark_baseline.json", help="JSON de referencia con el que comparar")
+    parser.add_argument("--save-baseline", action="store_true", help="guarda los resultados como nueva referencia")
+    parser.add_argument("--threshold", type=float, default=0.25, help="empeoramiento relativo admitido (0.25 = 25%%)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="no medir el pico de memoria")
+    parser.add_argument("--cube-depths", type=parse_range, default="1-6")
+    parser.add_argument("--legacy-cube-depth", type=int, default=4, help="profundidad máxima para legacy_draw_cube")
+    parser.add_argument("--sides", type=parse_range, default="3-8")
+    parser.add_argument("--depths", type=parse_range, default="1-7")
+    parser.add_argument("--animation-depths", type=parse_range, default="1-3")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.cube_depths, args.sides, args.depths, args.animation_depths,
+                             args.repeat, not args.no_memory, args.legacy_cube_depth)
+    report = {"environment": environment(), "results": results}
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    for name, result in results.items():
+        if result.get("skipped"):
+            print(f"{name:50s} {'saltada':>13s}")
+            continue
+        peak = f"{result['peak_bytes'] / 2**20:9.1f} MB" if "peak_bytes" in result else ""
+        print(f"{name:50s} {result['seconds'] * 1000:10.2f} ms {peak}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        return 0
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"Sin referencia en {args.baseline}; usa --save-baseline para crearla")
+        return 0
+
+    regressions = compare(results, baseline["results"], args.threshold)
+    for name, metric, reference, current in regressions:
+        if metric == "skipped":
+            print(f"SALTADA {name}: la referencia la midió ({reference * 1000:.2f} ms) y ahora no se ha medido")
+            continue
+        print(f"REGRESIÓN {name} {metric}: {reference:.6g} -> {current:.6g} ({current / reference - 1:+.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from CubeGeometry3D import CubeLevels
+from PolygonGeometry2D import PolygonLevels
+
+LEVEL_CLASSES = {"cube": CubeLevels, "polygon": PolygonLevels}
+
+
+def load_levels(path):
+    """Carga una geometría guardada con save_levels"""
+    with np.load(path) as data:
+        return LEVEL_CLASSES[str(data["kind"])].from_arrays(data)
+
+
+def save_levels(path, levels):
+    """Guarda una geometría (CubeLevels o PolygonLevels) en un archivo .npz sin comprimir"""
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **levels.to_arrays())
+    os.replace(tmp, path)
+
+
+class GeometryCache:
+    """Caché LRU de geometría generada, limitada por memoria.
+
+    Las entradas se indexan por los parámetros que definen la forma del fractal
+    sin incluir la profundidad, por ejemplo ("regular", lados, escala) o
+    ("cube", tamaño). Pedir menos niveles de los guardados devuelve una vista
+    de la entrada; pedir más amplía la entrada desde su último nivel en lugar
+    de regenerarla. Con ``cache_dir`` cada entrada también se guarda como .npz
+    para que sobreviva a un reinicio del proceso.
+    """
+
+    def __init__(self, max_bytes=512 * 2**20, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, key, depth, build):
+        """Devuelve la geometría de ``key`` con ``depth`` niveles; ``build(depth)`` la genera si falta"""
+        levels = self.entries.get(key)
+        if levels is None:
+            levels = self._load(key)
+
+        if levels is not None and levels.max_depth >= depth:
+            self.hits += 1
+            self._store(key, levels, save=False)
+            return levels if levels.max_depth == depth else levels.truncated(depth)
+
+        self.misses += 1
+        levels = levels.extended(depth) if levels is not None else build(depth)
+        self._store(key, levels, save=True)
+        return levels
+
+    def peek(self, key):
+        """Geometría guardada para ``key`` con todos sus niveles, o None, sin generar nada"""
+        levels = self.entries.get(key)
+        if levels is None:
+            levels = self._load(key)
+            if levels is not None:
+                self._store(key, levels, save=False)
+        return levels
+
+    def put(self, key, levels):
+        """Guarda una geometría generada fuera de la caché (por ejemplo, en otro hilo)"""
+        old = self.entries.get(key)
+        if old is None or old.max_depth < levels.max_depth:
+            self._store(key, levels, save=True)
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+    def _store(self, key, levels, save):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.nbytes -= old.nbytes
+        self.entries[key] = levels
+        self.nbytes += levels.nbytes
+
+        # Expulsar las entradas usadas hace más tiempo, conservando siempre la última
+        while self.nbytes > self.max_bytes and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+        if save and self.cache_dir:
+            save_levels(self._path(key), levels)
+
+    def _path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{digest}.npz")
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        return load_levels(path)
@@ -0,0 +1,214 @@
+import struct
+
+import numpy as np
+
+from CubeGeometry3D import CubeLevels
+from PolygonGeometry2D import PolygonLevels
+
+# Formato .fractal: una cabecera fija de HEADER_SIZE bytes seguida de arrays
+# contiguos little-endian, cada uno alineado a ALIGNMENT bytes para que np.memmap
+# los abra sin copiarlos. La cabecera contiene:
+#   magia (8s), versión (H), tipo (H), número de arrays (I), mapa de colores (32s)
+# y después una entrada de 64 bytes por array:
+#   nombre (16s), dtype (8s), ndim (I), relleno (4x), forma (3Q), desplazamiento (Q)
+MAGIC = b"PYFRACTL"
+VERSION = 1
+HEADER_SIZE = 4096
+ALIGNMENT = 4096
+HEADER = struct.Struct("<8sHHI32s16x")
+ENTRY = struct.Struct("<16s8sI4x3QQ")
+MAX_ARRAYS = (HEADER_SIZE - HEADER.size) // ENTRY.size
+
+KINDS = {"cube": 0, "polygon": 1}
+KIND_NAMES = {code: kind for kind, code in KINDS.items()}
+
+
+class FractalFile:
+    """Geometría abierta desde un archivo .fractal.
+
+    ``levels`` es un CubeLevels o PolygonLevels cuyos niveles son vistas de los
+    arrays del archivo, así que se puede dibujar sin regenerar nada. ``arrays``
+    contiene todos los arrays guardados (por ejemplo "origins", "vertices",
+    "depths", "colors" o "palette") como np.memmap de solo lectura: abrir el
+    archivo no lee los datos, que se cargan por páginas al usarlos.
+    """
+
+    def __init__(self, path, kind, arrays, cmap):
+        self.path = path
+        self.kind = kind
+        self.arrays = arrays
+        self.cmap = cmap
+        self.levels = self._levels()
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    @property
+    def palette(self):
+        return self.arrays["palette"]
+
+    @property
+    def colors(self):
+        """Índice en ``palette`` de cada elemento, en el mismo orden que los niveles"""
+        return self.arrays["colors"]
+
+    def _levels(self):
+        a = self.arrays
+        splits = np.cumsum(a["counts"])[:-1]
+        if self.kind == "cube":
+            return CubeLevels(np.split(a["origins"], splits), np.split(a["sizes"], splits))
+        return PolygonLevels(np.array(a["template"]), np.array(a["pivots"]), float(a["ratio"][0]),
+                             np.split(a["centers"], splits), np.array(a["radii"]), self.cmap)
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _level_counts(levels, max_depth, branching):
+    counts = levels.counts()
+    for _ in range(levels.max_depth, max_depth):
+        counts.append(counts[-1] * branching)
+    return counts[:max_depth + 1]
+
+
+def _allocate(path, kind, specs, cmap=""):
+    """Escribe la cabecera, reserva el archivo y devuelve los arrays abiertos para escritura.
+
+    ``specs`` es una lista de (nombre, dtype, forma) con como máximo tres dimensiones.
+    """
+    if len(specs) > MAX_ARRAYS:
+        raise ValueError(f"demasiados arrays para la cabecera: {len(specs)}")
+
+    header = bytearray(HEADER_SIZE)
+    HEADER.pack_into(header, 0, MAGIC, VERSION, KINDS[kind], len(specs), cmap.encode("ascii"))
+    offset, layout = HEADER_SIZE, []
+    for i, (name, dtype, shape) in enumerate(specs):
+        dtype = np.dtype(dtype).newbyteorder("<")
+        padded = tuple(shape) + (0,) * (3 - len(shape))
+        ENTRY.pack_into(header, HEADER.size + i * ENTRY.size, name.encode("ascii"), dtype.str.encode("ascii"),
+                        len(shape), *padded, offset)
+        layout.append((name, dtype, tuple(shape), offset))
+        offset = _aligned(offset + dtype.itemsize * int(np.prod(shape)))
+
+    with open(path, "wb") as f:
+        f.write(header)
+        f.truncate(offset)
+
+    return {name: _open_array(path, dtype, shape, offset, "r+") for name, dtype, shape, offset in layout}
+
+
+def _open_array(path, dtype, shape, offset, mode):
+    if int(np.prod(shape)) == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode=mode, offset=offset, shape=shape)
+
+
+def _write_stream(out, counts, chunks, fill):
+    """Rellena los arrays de ``out`` bloque a bloque; ``fill(out, depth, sl, chunk)`` copia un bloque"""
+    offsets = np.cumsum([0] + counts)
+    for chunk in chunks:
+        depth, start = chunk[0], chunk[1]
+        sl = slice(offsets[depth] + start, offsets[depth] + start + len(chunk[2]))
+        out["depths"][sl] = depth
+        fill(out, depth, sl, chunk)
+    for array in out.values():
+        if isinstance(array, np.memmap):
+            array.flush()
+
+
+def export_cube(path, levels, max_depth=None, palette=None, color_index=None, max_elements=65536):
+    """Guarda un cubo fractal en formato .fractal.
+
+    Los niveles que falten hasta ``max_depth`` se generan por bloques mientras
+    se escriben, así que la memoria no depende de la profundidad. ``palette``
+    (P, 4) e ``color_index(depth, n)`` dan el color de cada cubo; por defecto
+    el índice de color es la profundidad.
+    """
+    max_depth = levels.max_depth if max_depth is None else max_depth
+    counts = _level_counts(levels, max_depth, 8)
+    n = sum(counts)
+    palette = np.zeros((0, 4)) if palette is None else np.asarray(palette)
+    color_index = color_index or (lambda depth, count: depth)
+
+    out = _allocate(path, "cube", [
+        ("counts", np.int64, (len(counts),)),
+        ("level_sizes", np.float64, (len(counts),)),
+        ("origins", np.float64, (n, 3)),
+        ("sizes", np.float64, (n,)),
+        ("depths", np.uint8, (n,)),
+        ("colors", np.uint8, (n,)),
+        ("palette", np.float32, palette.shape),
+    ])
+    out["counts"][:] = counts
+    out["palette"][:] = palette
+
+    def fill(out, depth, sl, chunk):
+        _, _, origins, sizes = chunk
+        out["origins"][sl] = origins
+        out["sizes"][sl] = sizes
+        out["level_sizes"][depth] = sizes[0]
+        out["colors"][sl] = color_index(depth, len(origins))
+
+    _write_stream(out, counts, levels.iter_chunks(max_depth, max_elements), fill)
+
+
+def export_polygons(path, levels, max_depth=None, max_elements=65536):
+    """Guarda un fractal de polígonos en formato .fractal.
+
+    Además de los centros y radios con los que se reconstruye el PolygonLevels,
+    se guardan los vértices (K, lados, 2) de cada polígono para las herramientas
+    que los leen directamente. Los niveles que falten hasta ``max_depth`` se
+    generan por bloques mientras se escriben.
+    """
+    max_depth = levels.max_depth if max_depth is None else max_depth
+    counts = _level_counts(levels, max_depth, len(levels.pivots))
+    n = sum(counts)
+    palette = levels.palette(max_depth)
+
+    out = _allocate(path, "polygon", [
+        ("counts", np.int64, (len(counts),)),
+        ("radii", np.float64, (len(counts),)),
+        ("template", np.float64, levels.template.shape),
+        ("pivots", np.float64, levels.pivots.shape),
+        ("ratio", np.float64, (1,)),
+        ("centers", np.float64, (n, 2)),
+        ("vertices", np.float64, (n, levels.sides, 2)),
+        ("depths", np.uint8, (n,)),
+        ("colors", np.uint8, (n,)),
+        ("palette", np.float32, palette.shape),
+    ], levels.cmap)
+    out["counts"][:] = counts
+    out["template"][:] = levels.template
+    out["pivots"][:] = levels.pivots
+    out["ratio"][0] = levels.ratio
+    out["palette"][:] = palette
+
+    def fill(out, depth, sl, chunk):
+        _, _, centers, radius = chunk
+        out["centers"][sl] = centers
+        out["vertices"][sl] = centers[:, None, :] + radius * levels.template
+        out["radii"][depth] = radius
+        out["colors"][sl] = depth
+
+    _write_stream(out, counts, levels.iter_center_chunks(max_depth, max_elements), fill)
+
+
+def open_fractal(path):
+    """Abre un archivo .fractal con np.memmap, sin leer ni copiar los arrays"""
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or header[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} no es un archivo .fractal")
+
+    _, version, kind, count, cmap = HEADER.unpack_from(header, 0)
+    if version != VERSION:
+        raise ValueError(f"versión de .fractal no soportada: {version}")
+
+    arrays = {}
+    for i in range(count):
+        name, dtype, ndim, *shape, offset = ENTRY.unpack_from(header, HEADER.size + i * ENTRY.size)
+        name = name.rstrip(b"\0").decode("ascii")
+        arrays[name] = _open_array(path, np.dtype(dtype.rstrip(b"\0").decode("ascii")),
+                                   tuple(shape[:ndim]), offset, "r")
+    return FractalFile(path, KIND_NAMES[kind], arrays, cmap.rstrip(b"\0").decode("ascii"))
@@ -0,0 +1,201 @@
+import os
+import struct
+import subprocess
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+MOVIE_EXTENSIONS = (".gif", ".mp4")
+
+
+def _rgb_keys(colors):
+    """Clave uint32 de cada color RGB(A) (..., 3 o 4) de uint8"""
+    colors = np.asarray(colors, dtype=np.uint32)
+    return (colors[..., 0] << 16) | (colors[..., 1] << 8) | colors[..., 2]
+
+
+def movie_palette(images):
+    """Paleta (N, 3) de uint8 para un GIF: los colores exactos de ``images`` si son como mucho 256.
+
+    Si hay más (por ejemplo con muchas transparencias), se toma la paleta
+    adaptativa de Pillow para todas las imágenes juntas.
+    """
+    keys = np.unique(np.concatenate([_rgb_keys(image).reshape(-1) for image in images]))
+    if len(keys) <= 256:
+        return np.stack([keys >> 16, keys >> 8 & 255, keys & 255], axis=1).astype(np.uint8)
+
+    from PIL import Image
+    mosaic = np.concatenate([np.asarray(image)[..., :3] for image in images])
+    quantized = Image.fromarray(np.ascontiguousarray(mosaic)).quantize(256)
+    return np.array(quantized.getpalette()[:256 * 3], dtype=np.uint8).reshape(-1, 3)
+
+
+def encode_frame(image, palette=None, duration=50):
+    """Codifica un fotograma RGBA para el archivo de salida.
+
+    Sin ``palette`` devuelve los bytes RGB que lee ffmpeg. Con ella, el bloque
+    GIF del fotograma (cabecera local y datos LZW) con índices sobre esa paleta
+    global; los colores que no estén en la paleta se aproximan con Pillow.
+    """
+    rgb = np.ascontiguousarray(np.asarray(image)[..., :3])
+    if palette is None:
+        return rgb.tobytes()
+
+    from PIL import Image, GifImagePlugin
+    order = np.argsort(_rgb_keys(palette))
+    sorted_keys = _rgb_keys(palette)[order]
+    keys = _rgb_keys(rgb)
+    position = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    if np.array_equal(sorted_keys[position], keys):
+        frame = Image.fromarray(order[position].astype(np.uint8), "P")
+    else:
+        reference = Image.new("P", (1, 1))
+        reference.putpalette(palette.reshape(-1).tolist())
+        frame = Image.fromarray(rgb).quantize(palette=reference, dither=Image.Dither.NONE)
+    frame.putpalette(palette.reshape(-1).tolist())
+    return b"".join(GifImagePlugin.getdata(frame, duration=duration))
+
+
+class GifStream:
+    """Escribe un GIF animado fotograma a fotograma, sin guardar los anteriores en memoria.
+
+    Todos los fotogramas comparten la paleta global ``palette`` (ver
+    movie_palette y encode_frame) y el GIF se repite indefinidamente.
+    """
+
+    def __init__(self, path, width, height, fps, palette):
+        self.path = path
+        self.palette = np.asarray(palette, dtype=np.uint8).reshape(-1, 3)
+        self.duration = int(round(1000 / fps))
+        bits = max(1, int(np.ceil(np.log2(len(self.palette)))))
+        table = np.zeros((2**bits, 3), dtype=np.uint8)
+        table[:len(self.palette)] = self.palette
+
+        self.file = open(path, "wb")
+        self.file.write(b"GIF89a" + struct.pack("<HHBBB", width, height, 0x80 | (bits - 1) << 4 | (bits - 1), 0, 0))
+        self.file.write(table.tobytes())
+        self.file.write(b"!\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", 0) + b"\x00")
+
+    def write(self, data):
+        self.file.write(data)
+
+    def close(self):
+        self.file.write(b";")
+        self.file.close()
+
+
+class FFmpegStream:
+    """Pasa fotogramas RGB a ffmpeg por su entrada estándar para codificar un MP4 (H.264).
+
+    Se usa el ejecutable de ``rcParams["animation.ffmpeg_path"]``, como en las animaciones de matplotlib.
+    """
+
+    def __init__(self, path, width, height, fps):
+        from matplotlib import rcParams
+        self.path = path
+        command = [rcParams["animation.ffmpeg_path"], "-y", "-loglevel", "error",
+                   "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+                   "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-c:v", "libx264", "-pix_fmt", "yuv420p", path]
+        try:
+            self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        except FileNotFoundError:
+            raise RuntimeError("no se encuentra ffmpeg para escribir MP4; instálalo o guarda la animación como .gif") from None
+
+    def write(self, data):
+        self.process.stdin.write(data)
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg terminó con código {self.process.returncode}")
+
+
+def open_movie(path, width, height, fps=20, palette=None):
+    """GifStream o FFmpegStream según la extensión de ``path``"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".gif":
+        return GifStream(path, width, height, fps, palette)
+    elif ext == ".mp4":
+        return FFmpegStream(path, width, height, fps)
+    raise ValueError(f"formato de animación no soportado: {ext} (usa {' o '.join(MOVIE_EXTENSIONS)})")
+
+
+def _same_frame(image):
+    return image
+
+
+def _render_and_encode(render, task, palette, duration):
+    """Trabajo de cada proceso: fotograma de ``task`` ya codificado"""
+    return encode_frame(render(task), palette, duration)
+
+
+def iter_write_movie(path, tasks, size, fps=20, palette=None, render=_same_frame, workers=None,
+                     initializer=None, initargs=(), cancelled=lambda: False, context=None):
+    """Escribe una animación .gif o .mp4 y produce el número de fotogramas escritos tras cada uno.
+
+    Cada elemento de ``tasks`` se convierte en un fotograma RGBA de ``size``
+    (ancho, alto) con ``render(task)`` y se codifica (ver encode_frame) en un
+    ProcessPoolExecutor de ``workers`` procesos, preparados con
+    ``initializer(*initargs)`` y creados con el contexto de multiprocessing
+    ``context``; ``render`` debe poder enviarse a otro proceso.
+    Por defecto las tareas ya son los fotogramas. Solo hay unos pocos
+    fotogramas en curso a la vez y se escriben en orden según terminan, así
+    que la memoria no depende del número de fotogramas. Para GIF hace falta
+    ``palette`` (ver movie_palette). Si se cancela, el archivo incompleto se borra.
+    """
+    width, height = size
+    writer = open_movie(path, width, height, fps, palette)
+    palette = writer.palette if isinstance(writer, GifStream) else None
+    duration = int(round(1000 / fps))
+    done = False
+    try:
+        if workers is not None and workers <= 1:
+            if initializer is not None:
+                initializer(*initargs)
+            encoded = (_render_and_encode(render, task, palette, duration) for task in tasks)
+            for count, data in enumerate(encoded, 1):
+                if cancelled():
+                    return
+                writer.write(data)
+                yield count
+        else:
+            workers = workers or os.cpu_count()
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=initializer,
+                                     initargs=initargs) as pool:
+                pending = deque()
+                count = 0
+                for task in tasks:
+                    if cancelled():
+                        return
+                    pending.append(pool.submit(_render_and_encode, render, task, palette, duration))
+                    if len(pending) >= 2 * workers:
+                        writer.write(pending.popleft().result())
+                        count += 1
+                        yield count
+                while pending:
+                    if cancelled():
+                        return
+                    writer.write(pending.popleft().result())
+                    count += 1
+                    yield count
+        done = True
+    finally:
+        if done:
+            writer.close()
+        else:
+            try:
+                writer.close()
+            except RuntimeError:
+                pass
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def write_movie(path, tasks, size, fps=20, palette=None, render=_same_frame, workers=None,
+                initializer=None, initargs=()):
+    """Como iter_write_movie, pero escribe toda la animación y devuelve el número de fotogramas"""
+    count = 0
+    for count in iter_write_movie(path, tasks, size, fps, palette, render, workers, initializer, initargs):
+        pass
+    return count
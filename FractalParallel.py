@@ -0,0 +1,151 @@
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+
+def expand_points(points, displacement):
+    """Un nivel de subdivisión: cada punto genera len(displacement) hijos desplazados.
+
+    Los hijos del punto p quedan en las posiciones b*p ... b*p+b-1 del resultado.
+    """
+    return (points[:, None, :] + displacement).reshape(-1, points.shape[1])
+
+
+def expand_levels(root, displacements, workers=None, split_depth=None):
+    """Genera todos los niveles a partir de las raíces ``root`` (N, k).
+
+    ``displacements[d]`` es el array (b, k) de desplazamientos de los hijos al
+    pasar del nivel d al d+1. Con ``workers`` > 1 los subárboles por debajo de
+    ``split_depth`` se reparten entre procesos (ver expand_levels_parallel).
+    """
+    if workers is not None and workers > 1 and len(displacements) > 0:
+        return expand_levels_parallel(root, displacements, workers, split_depth)
+
+    levels = [root]
+    for displacement in displacements:
+        levels.append(expand_points(levels[-1], displacement))
+    return levels
+
+
+def default_split_depth(branching, workers, max_depth):
+    """Primer nivel con al menos cuatro subárboles por proceso"""
+    depth = 1
+    while branching ** depth < 4 * workers and depth < max_depth:
+        depth += 1
+    return depth
+
+
+def _expand_shard(roots, start, displacements, outputs):
+    """Proceso hijo: expande un bloque contiguo de raíces y escribe cada nivel en memoria compartida"""
+    buffers = [SharedMemory(name=name) for name, _, _ in outputs]
+    try:
+        points = roots
+        for displacement, shm, (_, shape, dtype) in zip(displacements, buffers, outputs):
+            points = expand_points(points, displacement)
+            offset = start * (len(points) // len(roots))
+            out = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+            out[offset:offset + len(points)] = points
+            del out
+    finally:
+        for shm in buffers:
+            shm.close()
+
+
+def expand_levels_parallel(root, displacements, workers=None, split_depth=None):
+    """Versión con ProcessPoolExecutor de expand_levels.
+
+    Los niveles hasta ``split_depth`` se generan en el proceso principal; sus
+    nodos se reparten en bloques contiguos entre ``workers`` procesos, que
+    escriben los niveles más profundos directamente en bloques de memoria
+    compartida. Como los hijos de un bloque contiguo también son contiguos, el
+    orden del resultado es idéntico al de la versión secuencial. Los niveles
+    devueltos usan esos bloques sin copiarlos; cada bloque se libera cuando su
+    array (y las vistas que salgan de él) dejan de usarse.
+    """
+    workers = workers or os.cpu_count()
+    branching = len(displacements[0])
+    if split_depth is None:
+        split_depth = default_split_depth(branching, workers, len(displacements))
+    split_depth = min(split_depth, len(displacements))
+
+    levels = expand_levels(root, displacements[:split_depth])
+    deeper = displacements[split_depth:]
+    if not deeper:
+        return levels
+
+    roots = levels[-1]
+    count, width = roots.shape
+    outputs, buffers = [], []
+    try:
+        for displacement in deeper:
+            count *= len(displacement)
+            shape = (count, width)
+            shm = SharedMemory(create=True, size=max(1, count * width * roots.itemsize))
+            buffers.append(shm)
+            outputs.append((shm.name, shape, roots.dtype))
+
+        shards = np.array_split(np.arange(len(roots)), min(len(roots), workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_expand_shard, roots[shard[0]:shard[-1] + 1], shard[0], deeper, outputs)
+                       for shard in shards if len(shard)]
+            for future in futures:
+                future.result()
+    except BaseException:
+        for shm in buffers:
+            shm.close()
+        raise
+    finally:
+        # El nombre ya no hace falta: la memoria sigue mapeada mientras no se cierre
+        for shm in buffers:
+            shm.unlink()
+
+    for shm, (_, shape, dtype) in zip(buffers, outputs):
+        level = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        # Las vistas de level lo mantienen vivo, así que el bloque se cierra cuando ya nadie lo usa;
+        # al salir del programa no se cierra, por si otro hilo aún lo está leyendo
+        weakref.finalize(level, shm.close).atexit = False
+        levels.append(level)
+
+    return levels
+
+
+def level_range(base, base_depth, displacements, depth, start, stop):
+    """Puntos start..stop-1 del nivel ``depth`` sin generar el nivel completo.
+
+    ``base`` es el nivel ``base_depth`` ya calculado y ``displacements[k]`` lleva
+    del nivel base_depth+k al siguiente. Solo se expanden los antecesores del
+    rango pedido, así que el coste es proporcional a stop - start.
+    """
+    if depth == base_depth:
+        return base[start:stop]
+
+    displacement = displacements[depth - base_depth - 1]
+    branching = len(displacement)
+    first, last = start // branching, (stop - 1) // branching + 1
+    parents = level_range(base, base_depth, displacements, depth - 1, first, last)
+    children = expand_points(parents, displacement)
+    return children[start - first * branching:stop - first * branching]
+
+
+def iter_level_ranges(levels, displacements, max_depth, max_elements):
+    """Recorre los niveles en anchura en bloques de como máximo ``max_elements`` puntos.
+
+    Los niveles de ``levels`` ya están calculados; los siguientes, hasta
+    ``max_depth``, se generan bloque a bloque con level_range, de modo que la
+    memoria usada no depende de la profundidad. Produce (nivel, inicio, puntos).
+    """
+    base_depth = len(levels) - 1
+    for depth in range(max_depth + 1):
+        if depth <= base_depth:
+            count = len(levels[depth])
+        else:
+            count *= len(displacements[depth - base_depth - 1])
+        for start in range(0, count, max_elements):
+            stop = min(count, start + max_elements)
+            if depth <= base_depth:
+                yield depth, start, levels[depth][start:stop]
+            else:
+                yield depth, start, level_range(levels[-1], base_depth, displacements, depth, start, stop)
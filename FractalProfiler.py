@@ -0,0 +1,133 @@
+import json
+import os
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+
+
+class Profiler:
+    """Temporizadores y contadores con nombre para las rutas críticas de las aplicaciones.
+
+    ``timer(nombre)`` mide un bloque, ``count(nombre, n)`` acumula un contador y
+    ``frame(nombre)`` marca un fotograma para calcular su frecuencia. Los datos
+    se pueden mostrar en pantalla (ver ProfileOverlay) o exportar como traza de
+    Chrome (chrome://tracing, Perfetto) con export_trace.
+    """
+
+    enabled = True
+
+    def __init__(self, max_events=100000, fps_window=30):
+        self.max_events = max_events
+        self.fps_window = fps_window
+        self.reset()
+
+    def reset(self):
+        self.start = time.perf_counter()
+        self.events = deque(maxlen=self.max_events)
+        self.counters = defaultdict(int)
+        self.last = {}
+        self.totals = defaultdict(float)
+        self.frames = defaultdict(lambda: deque(maxlen=self.fps_window))
+
+    def _us(self, t):
+        return (t - self.start) * 1e6
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.last[name] = end - start
+            self.totals[name] += end - start
+            self.events.append({"name": name, "ph": "X", "ts": self._us(start), "dur": (end - start) * 1e6,
+                                "pid": os.getpid(), "tid": 0})
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+        self.events.append({"name": name, "ph": "C", "ts": self._us(time.perf_counter()),
+                            "pid": os.getpid(), "tid": 0, "args": {name: self.counters[name]}})
+
+    def frame(self, name):
+        now = time.perf_counter()
+        self.frames[name].append(now)
+        self.events.append({"name": name, "ph": "i", "s": "t", "ts": self._us(now), "pid": os.getpid(), "tid": 0})
+
+    def fps(self, name):
+        """Fotogramas por segundo de ``name`` en los últimos fotogramas marcados"""
+        ticks = self.frames.get(name)
+        if not ticks or len(ticks) < 2 or ticks[-1] == ticks[0]:
+            return 0.0
+        return (len(ticks) - 1) / (ticks[-1] - ticks[0])
+
+    def summary(self):
+        """Líneas de texto con el último tiempo de cada temporizador, los contadores y los FPS"""
+        lines = [f"{name}: {seconds * 1000:.1f} ms" for name, seconds in self.last.items()]
+        lines += [f"{name}: {value}" for name, value in self.counters.items()]
+        lines += [f"{name}: {self.fps(name):.1f} FPS" for name in self.frames]
+        return lines
+
+    def export_trace(self, path):
+        """Guarda los eventos en formato JSON de trazas de Chrome"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": list(self.events), "displayTimeUnit": "ms",
+                       "otherData": {"counters": dict(self.counters), "totals": dict(self.totals)}}, f)
+
+
+class NullProfiler:
+    """Profiler desactivado: los mismos métodos sin hacer nada"""
+
+    enabled = False
+    _null = nullcontext()
+
+    def timer(self, name):
+        return self._null
+
+    def count(self, name, n=1):
+        pass
+
+    def frame(self, name):
+        pass
+
+    def fps(self, name):
+        return 0.0
+
+    def summary(self):
+        return []
+
+    def reset(self):
+        pass
+
+    def export_trace(self, path):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def profiler_from_env():
+    """Profiler activo si la variable PYFRACTALS_PROFILE está definida, si no el nulo"""
+    return Profiler() if os.environ.get("PYFRACTALS_PROFILE") else NULL_PROFILER
+
+
+class ProfileOverlay:
+    """Texto sobre la figura con el resumen de un Profiler.
+
+    Está oculto hasta set_visible(True); update() escribe el resumen actual y
+    se muestra en el siguiente dibujado de la figura.
+    """
+
+    def __init__(self, fig, profiler):
+        self.profiler = profiler
+        self.text = fig.text(0.01, 0.01, "", fontsize=8, family="monospace", va="bottom",
+                             bbox=dict(facecolor='white', alpha=0.8, edgecolor='none'))
+        self.text.set_visible(False)
+
+    def set_visible(self, visible):
+        self.text.set_visible(visible)
+        self.update()
+
+    def update(self):
+        if self.text.get_visible():
+            self.text.set_text("\n".join(self.profiler.summary()))
@@ -0,0 +1,233 @@
+import struct
+import zlib
+
+import numpy as np
+
+from CubeGeometry3D import CubeLattice
+
+# Los archivos se escriben por bloques de elementos con un búfer grande, sin
+# crear artistas de matplotlib: cada bloque se formatea con una sola operación
+# de cadena sobre el array completo.
+BUFFER_SIZE = 1 << 20
+
+
+def format_rows(row_format, rows):
+    """Aplica ``row_format`` a cada fila de ``rows`` (K, m) con una sola operación %"""
+    rows = np.asarray(rows)
+    if len(rows) == 0:
+        return ""
+    return (row_format * len(rows)) % tuple(rows.reshape(-1).tolist())
+
+
+def _hex(color):
+    return "#%02x%02x%02x" % tuple(int(round(c * 255)) for c in color[:3])
+
+
+def _page_transform(levels, width, margin):
+    """Escala y desplazamiento que llevan los polígonos a una página de ``width`` de ancho"""
+    low, high = levels.bounds()
+    scale = (width - 2 * margin) / max(high[0] - low[0], 1e-12)
+    height = (high[1] - low[1]) * scale + 2 * margin
+    return low, high, scale, height
+
+
+def write_svg(path, levels, max_depth=None, width=800, margin=10, line_width=1.0, max_elements=65536):
+    """Guarda los contornos de un PolygonLevels como SVG, un <path> por bloque de polígonos.
+
+    Los niveles que falten hasta ``max_depth`` se generan por bloques mientras se
+    escriben (ver PolygonLevels.iter_chunks).
+    """
+    max_depth = levels.max_depth if max_depth is None else max_depth
+    low, high, scale, height = _page_transform(levels, width, margin)
+    colors = levels.palette(max_depth)
+    polygon = "M%.3f %.3f" + "L%.3f %.3f" * (levels.sides - 1) + "Z"
+
+    with open(path, "w", encoding="ascii", buffering=BUFFER_SIZE) as f:
+        f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height:.0f}" '
+                f'viewBox="0 0 {width} {height:.3f}">\n'
+                f'<g fill="none" stroke-width="{line_width}" stroke-linejoin="round">\n')
+        for depth, _, vertices in levels.iter_chunks(max_depth, max_elements):
+            # El eje y del SVG crece hacia abajo
+            points = np.empty_like(vertices)
+            points[..., 0] = (vertices[..., 0] - low[0]) * scale + margin
+            points[..., 1] = (high[1] - vertices[..., 1]) * scale + margin
+            f.write(f'<path stroke="{_hex(colors[depth])}" d="')
+            f.write(format_rows(polygon, points.reshape(len(points), -1)))
+            f.write('"/>\n')
+        f.write("</g>\n</svg>\n")
+
+
+def write_pdf(path, levels, max_depth=None, width=800, margin=10, line_width=1.0, max_elements=65536):
+    """Guarda los contornos de un PolygonLevels como PDF de una página.
+
+    El contenido de la página se comprime con zlib a medida que se generan los
+    bloques, así que nunca se guarda entero en memoria.
+    """
+    max_depth = levels.max_depth if max_depth is None else max_depth
+    low, high, scale, height = _page_transform(levels, width, margin)
+    colors = levels.palette(max_depth)
+    polygon = "%.3f %.3f m " + "%.3f %.3f l " * (levels.sides - 1) + "h\n"
+
+    with open(path, "wb", buffering=BUFFER_SIZE) as f:
+        offsets = []
+
+        def start_object(number):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number)
+
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        start_object(1)
+        f.write(b"<< /Type /Catalog /Pages 2 0 R >>\nendobj\n")
+        start_object(2)
+        f.write(b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>\nendobj\n")
+        start_object(3)
+        f.write(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %.3f] /Resources << >> /Contents 4 0 R >>\n"
+                b"endobj\n" % (width, height))
+
+        # Flujo de contenido con la longitud en un objeto aparte, escrita al final
+        start_object(4)
+        f.write(b"<< /Length 5 0 R /Filter /FlateDecode >>\nstream\n")
+        start = f.tell()
+        compressor = zlib.compressobj()
+        f.write(compressor.compress(b"1 J 1 j %.3f w\n" % line_width))
+        for depth, _, vertices in levels.iter_chunks(max_depth, max_elements):
+            points = np.empty_like(vertices)
+            points[..., 0] = (vertices[..., 0] - low[0]) * scale + margin
+            points[..., 1] = (vertices[..., 1] - low[1]) * scale + margin
+            content = "%.3f %.3f %.3f RG\n" % tuple(colors[depth][:3])
+            content += format_rows(polygon, points.reshape(len(points), -1)) + "S\n"
+            f.write(compressor.compress(content.encode("ascii")))
+        f.write(compressor.flush())
+        length = f.tell() - start
+        f.write(b"\nendstream\nendobj\n")
+        start_object(5)
+        f.write(b"%d\nendobj\n" % length)
+
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(offsets) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(offsets) + 1, xref))
+
+
+class CubeMeshStream:
+    """Recorre la malla de un CubeLevels por bloques sin guardar nada de lo ya recorrido.
+
+    Cada nivel llena el cubo raíz, así que los cubos del nivel ``max_depth``
+    ocupan todas las celdas de su CubeLattice: sus esquinas son todos los
+    puntos de la rejilla, y el número de cada vértice es directamente su clave.
+    Las aristas y diagonales de ese nivel cubren las de los niveles anteriores,
+    así que las aristas son los segmentos entre puntos vecinos de la rejilla y
+    las caras, los cuadrados de la rejilla sobre la superficie exterior, cada
+    uno una sola vez. El coste de cada bloque solo depende de ``max_elements``.
+    """
+
+    def __init__(self, levels, max_depth=None):
+        self.max_depth = levels.max_depth if max_depth is None else max_depth
+        self.lattice = CubeLattice.of(levels, self.max_depth)
+        depth = next(d for d, level in enumerate(levels.origins) if len(level))
+        if len(levels.origins[depth]) * 8**(self.max_depth - depth) != (self.lattice.side - 1)**3:
+            raise ValueError("los cubos no llenan la caja que los contiene")
+        side = self.lattice.side
+        self.strides = np.array([side**2, side, 1])
+
+    def _iter_grid(self, max_elements):
+        """Produce (claves, coordenadas enteras) de los puntos de la rejilla por bloques, en orden de clave"""
+        total = self.lattice.side**3
+        for start in range(0, total, max_elements):
+            keys = np.arange(start, min(total, start + max_elements))
+            yield keys, self.lattice.grid(keys)
+
+    def iter_vertices(self, max_elements=65536):
+        """Produce las coordenadas de todos los puntos de la rejilla, en el orden de sus claves"""
+        for _, grid in self._iter_grid(max_elements):
+            yield self.lattice.low + grid * self.lattice.step
+
+    def iter_edges(self, max_elements=65536):
+        """Produce las aristas (E, 2) entre puntos vecinos de la rejilla, como claves de sus vértices"""
+        edge = self.lattice.side - 1
+        for keys, grid in self._iter_grid(max_elements):
+            yield np.concatenate([np.stack([keys, keys + stride], axis=1)[grid[:, axis] < edge]
+                                  for axis, stride in enumerate(self.strides)])
+
+    def iter_diagonals(self, max_elements=65536):
+        """Produce las diagonales (D, 2) de los cubos del nivel ``max_depth``, como en CUBE_DIAGONALS"""
+        edge = self.lattice.side - 1
+        x, y, z = self.strides
+        for keys, grid in self._iter_grid(max_elements):
+            origins = keys[np.all(grid < edge, axis=1)]
+            yield np.concatenate([np.stack([origins, origins + x + y + z], axis=1),
+                                  np.stack([origins + x, origins + y + z], axis=1)])
+
+    def iter_faces(self, max_elements=65536):
+        """Produce las caras (F, 4) de la superficie exterior, con el sentido hacia fuera de CUBE_FACES.
+
+        Cada lado de la caja es una cuadrícula de caras que se recorre por filas,
+        así que no se visita ningún cubo interior.
+        """
+        edge = self.lattice.side - 1
+        rows = max(1, max_elements // edge)
+        for axis in range(3):
+            # (u, v, eje) siguen el orden cíclico x, y, z: u x v apunta hacia fuera en el lado alto
+            u, v = self.strides[(axis + 1) % 3], self.strides[(axis + 2) % 3]
+            for plane, corners in ((0, [0, v, u + v, u]), (edge, [0, u, u + v, v])):
+                for first in range(0, edge, rows):
+                    i, j = np.meshgrid(np.arange(first, min(edge, first + rows)), np.arange(edge), indexing="ij")
+                    keys = plane * self.strides[axis] + i.reshape(-1) * u + j.reshape(-1) * v
+                    yield keys[:, None] + np.array(corners)
+
+
+def write_obj(path, levels, max_depth=None, edges=True, diagonals=False, faces=True, max_elements=65536):
+    """Guarda un CubeLevels como OBJ con vértices compartidos.
+
+    Las aristas y diagonales se escriben como líneas ``l`` y las caras
+    exteriores como cuadriláteros ``f``. Cada vértice, arista y cara aparece una
+    sola vez (ver CubeMeshStream).
+    """
+    mesh = CubeMeshStream(levels, max_depth)
+    parts = []
+    if edges:
+        parts.append(("l %d %d\n", mesh.iter_edges))
+    if diagonals:
+        parts.append(("l %d %d\n", mesh.iter_diagonals))
+    if faces:
+        parts.append(("f %d %d %d %d\n", mesh.iter_faces))
+    with open(path, "w", encoding="ascii", buffering=BUFFER_SIZE) as f:
+        f.write("# PyFractals cubo fractal, profundidad %d\n" % mesh.max_depth)
+        for points in mesh.iter_vertices(max_elements):
+            f.write(format_rows("v %.6g %.6g %.6g\n", points))
+        # Los vértices se escriben en el orden de sus claves: el índice OBJ es la clave más uno
+        for row_format, chunks in parts:
+            for keys in chunks(max_elements):
+                f.write(format_rows(row_format, keys + 1))
+
+
+STL_TRIANGLE = np.dtype([("normal", "<f4", 3), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+
+
+def write_stl(path, levels, max_depth=None, max_elements=65536):
+    """Guarda la superficie de un CubeLevels como STL binario, dos triángulos por cara.
+
+    Solo se recorren las caras exteriores de los cubos del nivel ``max_depth``
+    (ver CubeMeshStream.iter_faces), que se escriben según se generan. Las
+    normales apuntan hacia fuera del cubo. El número de triángulos se escribe
+    en la cabecera al terminar.
+    """
+    mesh = CubeMeshStream(levels, max_depth)
+    count = 0
+    with open(path, "wb", buffering=BUFFER_SIZE) as f:
+        f.write(b"PyFractals cubo fractal".ljust(80, b"\0"))
+        f.write(struct.pack("<I", 0))
+        for keys in mesh.iter_faces(max_elements):
+            quads = mesh.lattice.points(keys)
+            triangles = np.concatenate([quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]])
+            normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+            normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+
+            records = np.zeros(len(triangles), dtype=STL_TRIANGLE)
+            records["normal"] = normals
+            records["vertices"] = triangles
+            f.write(records.tobytes())
+            count += len(triangles)
+        f.seek(80)
+        f.write(struct.pack("<I", count))
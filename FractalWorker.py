@@ -0,0 +1,90 @@
+import queue
+import threading
+
+# Marca de fin en la cola de resultados
+_DONE = object()
+
+
+def grow_levels(base, depth, cancelled=lambda: False):
+    """Produce la geometría con un nivel más cada vez, desde ``base`` hasta ``depth``.
+
+    Sirve para CubeLevels y PolygonLevels; ``cancelled()`` se comprueba antes de
+    generar cada nivel.
+    """
+    levels = base.truncated(min(depth, base.max_depth))
+    yield levels
+    while levels.max_depth < depth:
+        if cancelled():
+            return
+        levels = levels.extended(levels.max_depth + 1)
+        yield levels
+
+
+class BackgroundTask:
+    """Ejecuta un generador en un hilo y entrega sus resultados al bucle de eventos de Tk.
+
+    ``produce(cancelled)`` se ejecuta en el hilo y produce resultados parciales;
+    debe comprobar ``cancelled()`` entre pasos largos. Los resultados pasan por
+    una queue.Queue que se vacía con ``root.after`` cada ``poll_ms``, así que
+    ``on_item``, ``on_done`` y ``on_error`` se llaman siempre en el hilo de Tk.
+    Tras cancel() ya no se llama a ninguna de ellas.
+    """
+
+    def __init__(self, root, produce, on_item, on_done=None, on_error=None, poll_ms=30):
+        self.root = root
+        self.produce = produce
+        self.on_item = on_item
+        self.on_done = on_done
+        self.on_error = on_error
+        self.poll_ms = poll_ms
+        self.results = queue.Queue()
+        self.cancelled = threading.Event()
+        self.last = None
+        self.poll_id = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def running(self):
+        return self.poll_id is not None
+
+    def start(self):
+        self.thread.start()
+        self.poll_id = self.root.after(self.poll_ms, self._poll)
+        return self
+
+    def cancel(self):
+        """Pide al hilo que termine y descarta lo que quede por entregar"""
+        self.cancelled.set()
+        if self.poll_id is not None:
+            self.root.after_cancel(self.poll_id)
+            self.poll_id = None
+
+    def _run(self):
+        try:
+            for item in self.produce(self.cancelled.is_set):
+                if self.cancelled.is_set():
+                    return
+                self.results.put(item)
+            self.results.put(_DONE)
+        except Exception as error:
+            self.results.put(error)
+
+    def _poll(self):
+        self.poll_id = None
+        while not self.cancelled.is_set():
+            try:
+                item = self.results.get_nowait()
+            except queue.Empty:
+                self.poll_id = self.root.after(self.poll_ms, self._poll)
+                return
+
+            if item is _DONE:
+                if self.on_done:
+                    self.on_done(self.last)
+                return
+            if isinstance(item, Exception):
+                if self.on_error:
+                    self.on_error(item)
+                return
+            self.last = item
+            self.on_item(item)
@@ -1,14 +1,175 @@
+import argparse
+import os
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.animation import FuncAnimation
-import tkinter as tk
-from tkinter import ttk
-import matplotlib.cm as cm
+from matplotlib.patches import PathPatch
+from matplotlib.path import Path
 import sys
+from PolygonGeometry2D import (sierpinski_levels, carpet_levels, regular_levels, generate_polygon_levels,
+                               polygon_key, close_outlines)
+from FractalBatch import load_sweep, output_path, agg_figure
+from FractalCache import GeometryCache
+from FractalExport import export_polygons, open_fractal
+from FractalVector import write_svg, write_pdf
+from PolygonRaster2D import rasterize_levels, chaos_game, iter_chaos_game, iter_construction_frames
+from FractalMovie import MOVIE_EXTENSIONS, movie_palette, iter_write_movie
+from FractalProfiler import NULL_PROFILER, Profiler, ProfileOverlay, profiler_from_env
+from FractalWorker import BackgroundTask, grow_levels
+
+# tkinter, pyplot y el backend TkAgg se cargan con load_gui() al abrir la ventana,
+# para que el renderizado sin pantalla no los importe
+plt = tk = ttk = filedialog = FigureCanvasTkAgg = FuncAnimation = None
+
+# Configuración de presets
+PRESETS = {
+    "Triángulo de Sierpinski": {"sides": 3, "depth": 5, "scale": 0.5, "algorithm": "sierpinski"},
+    "Alfombra de Sierpinski": {"sides": 4, "depth": 4, "scale": 0.33, "algorithm": "carpet"},
+    "Pentágono Fractal": {"sides": 5, "depth": 3, "scale": 0.38, "algorithm": "regular"},
+    "Hexágono Fractal": {"sides": 6, "depth": 3, "scale": 0.35, "algorithm": "regular"},
+    "Personalizado": {"sides": 4, "depth": 3, "scale": 0.5, "algorithm": "regular"}
+}
+
+ALGORITHMS = ["sierpinski", "carpet", "regular", "chaos"]
+
+# Tipo de los centros de los polígonos al dibujar: float32 basta para la
+# resolución de pantalla y ocupa la mitad. Las exportaciones usan float64.
+ELEMENT_DTYPE = np.float32
+
+def load_gui():
+    """Importa los módulos de la interfaz gráfica"""
+    global plt, tk, ttk, filedialog, FigureCanvasTkAgg, FuncAnimation
+    import matplotlib.pyplot as plt
+    import tkinter as tk
+    from tkinter import ttk, filedialog
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from matplotlib.animation import FuncAnimation
+
+def outline_patch(vertices, color):
+    """Contornos de los polígonos (K, lados, 2) como un único trazado de un color.
+
+    Todos los vértices van en un solo array (K*(lados+1), 2) con códigos uint8
+    que cierran cada polígono; una LineCollection, en cambio, guarda un array
+    aparte por polígono.
+    """
+    count, sides = vertices.shape[:2]
+    codes = np.full(sides + 1, Path.LINETO, dtype=Path.code_type)
+    codes[0], codes[-1] = Path.MOVETO, Path.CLOSEPOLY
+    path = Path(close_outlines(vertices).reshape(-1, 2), np.tile(codes, count))
+    return PathPatch(path, fill=False, edgecolor=color, lw=1.5)
+
+def draw_levels(ax, levels):
+    """Dibuja los polígonos con un trazado por nivel (ver outline_patch), con el color del nivel.
+
+    Los colores salen de la paleta por nivel, sin un array RGBA por polígono.
+    Devuelve los artistas añadidos.
+    """
+    colors = levels.palette()
+    artists = [ax.add_artist(outline_patch(levels.vertices(depth), colors[depth]))
+               for depth in range(levels.max_depth + 1)]
+    # Los límites salen de los centros: add_patch recorrería el trazado segmento a segmento
+    ax.update_datalim(levels.bounds())
+    ax.autoscale_view()
+    return artists
+
+def render_fractal(ax, sides, depth, scale, algorithm, workers=None, split_depth=None, cache=None,
+                   profiler=NULL_PROFILER, data=None):
+    """Genera un fractal con los parámetros de un preset y lo dibuja completo.
+
+    Con ``data`` (ver FractalExport.open_fractal) se dibujan los niveles
+    guardados hasta ``depth`` en lugar de generarlos.
+    """
+    build = lambda d: generate_polygon_levels(algorithm, sides, d, scale, workers, split_depth, ELEMENT_DTYPE)
+    with profiler.timer("geometria"):
+        if data is not None:
+            levels = data.levels.truncated(min(depth, data.levels.max_depth))
+            sides = levels.sides
+        elif cache is not None:
+            levels = cache.get(polygon_key(algorithm, sides, scale, ELEMENT_DTYPE), depth, build)
+        else:
+            levels = build(depth)
+    profiler.count("elementos", len(levels))
+    with profiler.timer("artistas"):
+        artists = draw_levels(ax, levels)
+    profiler.count("artistas", len(artists))
+    ax.set_aspect('equal')
+    ax.axis('off')
+    ax.set_title(f"Fractal {sides}-gonal\nProfundidad: {depth} - Algoritmo: {algorithm}")
+
+class IncrementalAnimation:
+    """Animación que en cada paso solo dibuja los elementos nuevos.
+
+    Los elementos se leen con ``levels.iter_chunks`` en bloques de ``per_frame``
+    y cada bloque va a un trazado (ver outline_patch) que se pinta con blitting
+    sobre lo ya dibujado. Al completar un nivel, sus bloques se sustituyen por
+    un único trazado.
+    """
+
+    def __init__(self, fig, ax, levels, interval, per_frame=1, profiler=NULL_PROFILER):
+        self.fig = fig
+        self.ax = ax
+        self.profiler = profiler
+        self.colors = levels.palette()
+        self.total = len(levels)
+        self.drawn = 0
+        self.depth = 0
+        self.blocks = levels.iter_chunks(max_elements=max(1, int(per_frame)))
+        self.vertices = []
+        self.chunks = []
+
+        self.progress = ax.text(0.02, 0.95, "", transform=ax.transAxes, fontsize=10,
+                                bbox=dict(facecolor='white', edgecolor='none'))
+        self.event_source = fig.canvas.new_timer(interval=interval)
+        self.event_source.add_callback(self.step)
+
+    def start(self):
+        self.fig.canvas.draw()
+        self.event_source.start()
+
+    def step(self):
+        """Dibuja el siguiente bloque; devuelve False cuando ya no quedan elementos"""
+        if self.drawn >= self.total:
+            return False
+
+        self.profiler.frame("animacion")
+        with self.profiler.timer("animacion.paso"):
+            self.draw_next()
+
+        if self.drawn >= self.total:
+            self.finish_level()
+            self.event_source.stop()
+        return self.drawn < self.total
+
+    def draw_next(self):
+        depth, _, vertices = next(self.blocks)
+        if depth != self.depth:
+            self.finish_level()
+            self.depth = depth
+
+        chunk = self.ax.add_artist(outline_patch(vertices, self.colors[depth]))
+        self.profiler.count("artistas")
+        self.vertices.append(vertices)
+        self.chunks.append(chunk)
+        self.drawn += len(vertices)
+        self.progress.set_text(f"Progreso: {self.drawn / self.total * 100:5.1f}%")
+
+        canvas = self.fig.canvas
+        if canvas.supports_blit:
+            self.ax.draw_artist(chunk)
+            self.ax.draw_artist(self.progress)
+            canvas.blit(self.ax.bbox)
+        else:
+            canvas.draw_idle()
+
+    def finish_level(self):
+        """Agrupa los bloques del nivel terminado en un solo trazado"""
+        for chunk in self.chunks:
+            chunk.remove()
+        self.ax.add_artist(outline_patch(np.concatenate(self.vertices), self.colors[self.depth]))
+        self.chunks = []
+        self.vertices = []
 
 class AnimatedFractalGeneratorApp:
     def __init__(self, root):
+        load_gui()
         self.root = root
         self.root.title("Generador de Fractales con Animación")
 
@@ -16,23 +177,33 @@ class AnimatedFractalGeneratorApp:
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Configuración de presets
-        self.presets = {
-            "Triángulo de Sierpinski": {"sides": 3, "depth": 5, "scale": 0.5, "algorithm": "sierpinski"},
-            "Alfombra de Sierpinski": {"sides": 4, "depth": 4, "scale": 0.33, "algorithm": "carpet"},
-            "Pentágono Fractal": {"sides": 5, "depth": 3, "scale": 0.38, "algorithm": "regular"},
-            "Hexágono Fractal": {"sides": 6, "depth": 3, "scale": 0.35, "algorithm": "regular"},
-            "Personalizado": {"sides": 4, "depth": 3, "scale": 0.5, "algorithm": "regular"}
-        }
+        self.presets = dict(PRESETS)
 
         self.is_running = True
         self.animation_running = False
         self.ani = None
+        
+        # Geometría ya generada, para no recalcularla al cambiar solo la visualización
+        self.cache = GeometryCache(cache_dir=os.environ.get("PYFRACTALS_CACHE_DIR"))
+        
+        # Perfilado: activo desde el inicio con PYFRACTALS_PROFILE, si no sin coste hasta activarlo
+        self.profiler = profiler_from_env()
+        
+        # Generación en segundo plano; cambiar cualquier parámetro la cancela
+        self.task = None
+        
+        # Exportación de la animación, también en segundo plano (ver export_movie)
+        self.movie_task = None
+        self.movie_title = None
         self.create_widgets()
+        for var in (self.sides_var, self.depth_var, self.scale_var, self.algorithm_var, self.samples_var):
+            var.trace_add("write", lambda *_: self.cancel_generation())
     
     def on_close(self):
         """Maneja el cierre de la ventana"""
         self.is_running = False
         self.stop_animation()
+        self.cancel_movie()
 
         if hasattr(self, "fig"):
             plt.close(self.fig)
@@ -84,7 +255,7 @@ class AnimatedFractalGeneratorApp:
         ttk.Label(control_frame, text="Algoritmo:").grid(row=4, column=0, sticky=tk.W)
         self.algorithm_var = tk.StringVar(value="sierpinski")
         self.algorithm_menu = ttk.Combobox(control_frame, textvariable=self.algorithm_var,
-                                         values=["sierpinski", "carpet", "regular"], state="readonly")
+                                         values=ALGORITHMS, state="readonly")
         self.algorithm_menu.grid(row=4, column=1, pady=5)
         
         # Opción de animación
@@ -98,15 +269,49 @@ class AnimatedFractalGeneratorApp:
                                     textvariable=self.speed_var)
         self.speed_spin.grid(row=6, column=1, pady=5)
         
+        # Animación incremental: varios elementos por paso dentro de un tiempo máximo
+        self.incremental_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(control_frame, text="Animación incremental", variable=self.incremental_var).grid(row=7, column=0, columnspan=2, pady=5)
+        
+        ttk.Label(control_frame, text="Duración máx. (s):").grid(row=8, column=0, sticky=tk.W)
+        self.duration_var = tk.IntVar(value=20)
+        self.duration_spin = ttk.Spinbox(control_frame, from_=1, to=600, increment=5,
+                                       textvariable=self.duration_var)
+        self.duration_spin.grid(row=8, column=1, pady=5)
+        
+        # Modo ráster: sin animación, dibuja directamente sobre una imagen
+        self.raster_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="Modo ráster", variable=self.raster_var).grid(row=9, column=0, columnspan=2, pady=5)
+        
+        # Puntos del juego del caos (algoritmo "chaos"), en millones
+        ttk.Label(control_frame, text="Muestras (M):").grid(row=10, column=0, sticky=tk.W)
+        self.samples_var = tk.DoubleVar(value=2)
+        self.samples_spin = ttk.Spinbox(control_frame, from_=0.1, to=500, increment=0.5,
+                                      textvariable=self.samples_var)
+        self.samples_spin.grid(row=10, column=1, pady=5)
+        
         # Botones
         generate_btn = ttk.Button(control_frame, text="Generar Fractal", command=self.generate_fractal)
-        generate_btn.grid(row=7, column=0, columnspan=2, pady=5)
+        generate_btn.grid(row=11, column=0, columnspan=2, pady=5)
         
         stop_btn = ttk.Button(control_frame, text="Detener Animación", command=self.stop_animation)
-        stop_btn.grid(row=8, column=0, columnspan=2, pady=5)
+        stop_btn.grid(row=12, column=0, columnspan=2, pady=5)
+        
+        # Perfilado
+        self.profile_var = tk.BooleanVar(value=self.profiler.enabled)
+        ttk.Checkbutton(control_frame, text="Mostrar rendimiento", variable=self.profile_var,
+                        command=self.toggle_profiling).grid(row=13, column=0, columnspan=2, pady=5)
+        ttk.Button(control_frame, text="Exportar traza", command=self.export_trace).grid(row=14, column=0, columnspan=2, pady=5)
+        
+        # Geometría en archivos .fractal
+        ttk.Button(control_frame, text="Exportar geometría", command=self.export_geometry).grid(row=15, column=0, columnspan=2, pady=5)
+        ttk.Button(control_frame, text="Abrir geometría", command=self.open_geometry).grid(row=16, column=0, columnspan=2, pady=5)
+        ttk.Button(control_frame, text="Exportar animación", command=self.export_movie).grid(row=17, column=0, columnspan=2, pady=5)
         
         # Frame de visualización
         self.fig, self.ax = plt.subplots(figsize=(8, 8))
+        self.overlay = ProfileOverlay(self.fig, self.profiler)
+        self.overlay.set_visible(self.profiler.enabled)
         self.ax.set_aspect('equal')
         self.ax.axis('off')
         
@@ -126,13 +331,27 @@ class AnimatedFractalGeneratorApp:
             self.algorithm_var.set(preset["algorithm"])
     
     def stop_animation(self):
+        self.cancel_generation()
         if self.ani:
             self.ani.event_source.stop()
             self.animation_running = False
     
+    def cancel_generation(self):
+        """Detiene la generación en curso; lo ya dibujado se queda en pantalla"""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+    
     def generate_fractal(self):
+        # Pulsar "Generar" durante una generación la cancela
+        if self.task is not None:
+            self.cancel_generation()
+            return
+        
         self.stop_animation()
         self.ax.clear()
+        self.ax.set_aspect('equal')
+        self.ax.axis('off')
         
         sides = self.sides_var.get()
         depth = self.depth_var.get()
@@ -141,30 +360,212 @@ class AnimatedFractalGeneratorApp:
         animate = self.animate_var.get()
         speed = self.speed_var.get()
         
-        # Almacenar todos los elementos a dibujar
-        self.all_elements = []
+        # El juego del caos no tiene niveles ni animación: basta con la raíz
+        chaos = algorithm == "chaos"
+        
+        # En modo ráster basta con la raíz: los niveles se generan por bloques al dibujar
+        raster = chaos or self.raster_var.get() and not animate
+        
+        # La raíz (o la geometría de la caché) se prepara aquí; el resto, en otro hilo
+        key = polygon_key(algorithm, sides, scale, ELEMENT_DTYPE)
+        base = self.cache.peek(key)
+        if base is None:
+            base = self.prepare_elements(algorithm, sides, 0, scale)
+        self.all_elements = base
+        self.image = None
+        self.drawn_depth = -1
+        bbox = self.ax.get_window_extent()
+        width, height = max(1, int(bbox.width)), max(1, int(bbox.height))
+        title = f"Fractal {sides}-gonal\nProfundidad: {depth} - Algoritmo: {algorithm}"
+        
+        if chaos:
+            samples = int(self.samples_var.get() * 1e6)
+            title = f"Fractal {sides}-gonal\nJuego del caos: {samples:,} muestras"
+            produce = lambda cancelled: iter_chaos_game(base, width, height, samples, cancelled=cancelled)
+            on_item = lambda item: self.show_image(item[0], item[1], f"{title} ({item[2] / samples:.0%})")
+            on_done = lambda item: self.finish_generation(title)
+        elif raster:
+            produce = lambda cancelled: [rasterize_levels(base, width, height, max_depth=depth, cancelled=cancelled)]
+            on_item = lambda item: self.show_image(*item, title)
+            on_done = lambda item: self.finish_generation(title)
+        else:
+            colors = base.palette(depth)
+            produce = lambda cancelled: grow_levels(base, depth, cancelled)
+            on_item = lambda levels: self.show_levels(levels, colors, depth, animate)
+            on_done = lambda levels: self.finish_levels(key, levels, sides, depth, algorithm, animate, speed, title)
         
-        # Generar elementos según el algoritmo
+        self.task = BackgroundTask(self.root, produce, on_item, on_done).start()
+    
+    def show_image(self, image, extent, title):
+        """Muestra (o actualiza) la imagen calculada en segundo plano"""
+        with self.profiler.timer("artistas"):
+            if self.image is None:
+                self.image = self.ax.imshow(image, extent=extent, interpolation='nearest')
+            else:
+                self.image.set_data(image)
+        self.ax.set_title(title)
+        self.draw_canvas()
+    
+    def show_levels(self, levels, colors, depth, animate):
+        """Dibuja los niveles que han terminado desde la última vez, cada uno en su trazado"""
+        if not animate:
+            with self.profiler.timer("artistas"):
+                for d in range(self.drawn_depth + 1, levels.max_depth + 1):
+                    self.ax.add_artist(outline_patch(levels.vertices(d), colors[d]))
+                    self.profiler.count("artistas")
+                self.ax.update_datalim(levels.bounds())
+                self.ax.autoscale_view()
+        self.drawn_depth = levels.max_depth
+        self.ax.set_title(f"Generando nivel {levels.max_depth} de {depth}...")
+        self.draw_canvas()
+    
+    def finish_levels(self, key, levels, sides, depth, algorithm, animate, speed, title):
+        self.task = None
+        self.cache.put(key, levels)
+        self.all_elements = levels
+        self.profiler.count("elementos", len(levels))
+        
+        if animate and self.incremental_var.get():
+            self.ax.clear()
+            self.setup_incremental_animation(sides, depth, algorithm, speed, self.duration_var.get())
+        elif animate:
+            self.setup_animation(sides, depth, algorithm, speed)
+        else:
+            self.finish_generation(title)
+    
+    def finish_generation(self, title):
+        self.task = None
+        self.ax.set_title(title)
+        self.draw_canvas()
+    
+    def draw_canvas(self):
+        """canvas.draw() midiendo su tiempo y con el resumen de rendimiento al día"""
+        self.overlay.update()
+        with self.profiler.timer("canvas.draw"):
+            self.canvas.draw()
+    
+    def toggle_profiling(self):
+        self.profiler = Profiler() if self.profile_var.get() else NULL_PROFILER
+        self.overlay.profiler = self.profiler
+        self.overlay.set_visible(self.profiler.enabled)
+        self.canvas.draw_idle()
+    
+    def export_trace(self):
+        """Guarda los datos del perfilado como traza de Chrome (chrome://tracing)"""
+        if not self.profiler.enabled:
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Traza de Chrome", "*.json")])
+        if path:
+            self.profiler.export_trace(path)
+    
+    def prepare_elements(self, algorithm, sides, depth, scale):
+        """Genera los elementos con el algoritmo que corresponda y los devuelve"""
         if algorithm == "sierpinski" and sides == 3:
             self.prepare_sierpinski(depth)
         elif algorithm == "carpet" and sides == 4:
             self.prepare_carpet(depth)
         else:
             self.prepare_regular_fractal(sides, depth, scale)
+        return self.all_elements
+    
+    def export_geometry(self):
+        """Guarda el fractal con los parámetros actuales en un archivo .fractal"""
+        path = filedialog.asksaveasfilename(defaultextension=".fractal",
+                                            filetypes=[("Geometría fractal", "*.fractal"), ("SVG", "*.svg"),
+                                                       ("PDF", "*.pdf")])
+        if path:
+            export_fractal(path, self.algorithm_var.get(), self.sides_var.get(), self.depth_var.get(),
+                           self.scale_var.get(), self.cache)
+    
+    def export_movie(self):
+        """Guarda la construcción del fractal en un .gif o .mp4 sin bloquear la interfaz.
         
-        if animate:
-            self.setup_animation(sides, depth, algorithm, speed)
-        else:
-            self.draw_all_elements()
-            self.ax.set_title(f"Fractal {sides}-gonal\nProfundidad: {depth} - Algoritmo: {algorithm}")
-            self.canvas.draw()
+        Un fotograma por paso de la animación (Velocidad) durante la Duración
+        máx.; el progreso se muestra en el título de la ventana y pulsar de
+        nuevo el botón cancela la exportación.
+        """
+        if self.movie_task is not None:
+            self.cancel_movie()
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".gif",
+                                            filetypes=[("GIF animado", "*.gif"), ("Vídeo MP4 (ffmpeg)", "*.mp4")])
+        if not path or os.path.splitext(path)[1].lower() not in MOVIE_EXTENSIONS:
+            return
+        sides = self.sides_var.get()
+        depth = self.depth_var.get()
+        scale = self.scale_var.get()
+        algorithm = self.algorithm_var.get()
+        fps = 1000 / self.speed_var.get()
+        frames = max(1, round(self.duration_var.get() * fps))
+        root = self.cache.peek(polygon_key(algorithm, sides, scale, ELEMENT_DTYPE))
+        if root is None:
+            root = generate_polygon_levels(algorithm, sides, 0, scale, dtype=ELEMENT_DTYPE)
+        # Procesos nuevos (spawn) en lugar de copias de este, que tiene Tk e hilos en marcha
+        import multiprocessing
+        context = multiprocessing.get_context("spawn")
+        self.movie_title = self.root.title()
+        self.movie_task = BackgroundTask(
+            self.root,
+            lambda cancelled: iter_export_construction(path, algorithm, sides, depth, scale, frames, fps=fps,
+                                                       root=root, cancelled=cancelled, context=context),
+            on_item=lambda count: self.root.title(f"{self.movie_title} - Exportando animación: {count} fotogramas"),
+            on_done=lambda _: self.finish_movie(),
+            on_error=lambda error: self.finish_movie(f"Error al exportar la animación: {error}")
+        ).start()
+    
+    def finish_movie(self, message=None):
+        self.movie_task = None
+        self.root.title(message or self.movie_title)
+    
+    def cancel_movie(self):
+        if self.movie_task is not None:
+            self.movie_task.cancel()
+            self.finish_movie()
+    
+    def open_geometry(self):
+        """Dibuja un fractal guardado en un archivo .fractal sin volver a generarlo"""
+        path = filedialog.askopenfilename(filetypes=[("Geometría fractal", "*.fractal")])
+        if not path:
+            return
+        data = open_fractal(path)
+        if data.kind != "polygon":
+            return
+        self.stop_animation()
+        self.ax.clear()
+        
+        # Los niveles son vistas del archivo: solo se leen los que se dibujan
+        depth = min(self.depth_var.get(), data.levels.max_depth)
+        self.all_elements = data.levels.truncated(depth)
+        self.profiler.count("elementos", len(self.all_elements))
+        with self.profiler.timer("artistas"):
+            artists = self.draw_all_elements()
+        self.profiler.count("artistas", len(artists))
+        self.ax.set_aspect('equal')
+        self.ax.axis('off')
+        self.ax.set_title(f"{os.path.basename(path)}\nProfundidad: {depth}")
+        self.draw_canvas()
     
     def draw_all_elements(self):
-        """Dibuja todos los elementos de una vez"""
-        for element in self.all_elements:
-            vertices, depth, color = element
-            closed = np.vstack([vertices, vertices[0]])
-            self.ax.plot(closed[:, 0], closed[:, 1], color=color, lw=1.5)
+        """Dibuja todos los elementos de una vez y devuelve los artistas añadidos"""
+        return draw_levels(self.ax, self.all_elements)
+    
+    def setup_incremental_animation(self, sides, depth, algorithm, speed, duration):
+        """Anima dibujando solo los elementos nuevos en cada paso, en como máximo ``duration`` segundos"""
+        self.ax.set_aspect('equal')
+        self.ax.axis('off')
+        self.ax.set_title(f"Fractal {sides}-gonal\nProfundidad: {depth} - Algoritmo: {algorithm}")
+        low, high = self.all_elements.bounds()
+        self.ax.update_datalim([low, high])
+        self.ax.autoscale_view()
+        
+        # Elementos por paso necesarios para no superar la duración máxima
+        frames = max(1, int(duration * 1000 / speed))
+        per_frame = -(-len(self.all_elements) // frames)
+        
+        self.ani = IncrementalAnimation(self.fig, self.ax, self.all_elements, speed, per_frame, self.profiler)
+        self.overlay.update()
+        self.ani.start()
+        self.animation_running = True
     
     def setup_animation(self, sides, depth, algorithm, speed):
         """Configura la animación paso a paso"""
@@ -181,23 +582,32 @@ class AnimatedFractalGeneratorApp:
             return []
         
         def update(frame):
+            self.profiler.frame("animacion")
+            with self.profiler.timer("animacion.update"):
+                draw_frame(frame)
+            self.overlay.update()
+            return []
+        
+        def draw_frame(frame):
             self.ax.clear()
             self.ax.set_aspect('equal')
             self.ax.axis('off')
             self.ax.set_title(f"Fractal {self.current_sides}-gonal\nProfundidad: {self.current_depth} - Algoritmo: {self.current_algorithm}")
             
-            # Dibujar todos los elementos hasta el frame actual
-            for i in range(min(frame+1, len(self.all_elements))):
-                vertices, depth, color = self.all_elements[i]
-                closed = np.vstack([vertices, vertices[0]])
-                self.ax.plot(closed[:, 0], closed[:, 1], color=color, lw=1.5)
+            # Dibujar todos los elementos hasta el frame actual, una colección por nivel
+            colors = self.all_elements.palette()
+            drawn = 0
+            for depth, vertices in self.all_elements.iter_range(0, frame + 1):
+                self.ax.add_artist(outline_patch(vertices, colors[depth]))
+                self.ax.update_datalim(vertices.reshape(-1, 2))
+                drawn += 1
+            self.ax.autoscale_view()
             
             # Mostrar progreso
             progress = min(100, (frame+1)/len(self.all_elements)*100)
             self.ax.text(0.02, 0.95, f"Progreso: {progress:.1f}%", 
                         transform=self.ax.transAxes, fontsize=10)
-            
-            return []
+            self.profiler.count("artistas", drawn + 1)
         
         self.ani = FuncAnimation(
             self.fig, 
@@ -213,79 +623,177 @@ class AnimatedFractalGeneratorApp:
     
     def prepare_sierpinski(self, depth):
         """Prepara los elementos para el triángulo de Sierpinski"""
-        colors = cm.plasma(np.linspace(0, 1, depth+1))
-        
-        def sierpinski(vertices, current_depth):
-            self.all_elements.append((vertices.copy(), current_depth, colors[current_depth]))
-            
-            if current_depth >= depth:
-                return
-                
-            v1, v2, v3 = vertices
-            mid1 = (v1 + v2) / 2
-            mid2 = (v2 + v3) / 2
-            mid3 = (v3 + v1) / 2
-            
-            sierpinski(np.array([v1, mid1, mid3]), current_depth+1)
-            sierpinski(np.array([mid1, v2, mid2]), current_depth+1)
-            sierpinski(np.array([mid3, mid2, v3]), current_depth+1)
-        
-        initial = np.array([[0, 0], [1, 0], [0.5, np.sqrt(3)/2]]) * 8 - np.array([4, 2.5])
-        sierpinski(initial, 0)
+        self.all_elements = sierpinski_levels(depth, dtype=ELEMENT_DTYPE)
     
     def prepare_carpet(self, depth):
         """Prepara los elementos para la alfombra de Sierpinski"""
-        colors = cm.viridis(np.linspace(0, 1, depth+1))
-        
-        def carpet(x, y, size, current_depth):
-            square = np.array([[x, y], [x+size, y], [x+size, y+size], [x, y+size]])
-            self.all_elements.append((square.copy(), current_depth, colors[current_depth]))
-            
-            if current_depth >= depth:
-                return
-                
-            new_size = size / 3
-            for i in range(3):
-                for j in range(3):
-                    if i == 1 and j == 1:
-                        continue
-                    carpet(x + i*new_size, y + j*new_size, new_size, current_depth+1)
-        
-        carpet(-4, -4, 8, 0)
+        self.all_elements = carpet_levels(depth, dtype=ELEMENT_DTYPE)
     
     def prepare_regular_fractal(self, sides, depth, scale):
         """Prepara elementos para fractales regulares"""
-        colors = cm.inferno(np.linspace(0, 1, depth+1))
-        
-        def generate_polygon(center, radius, rotation=0):
-            angles = np.linspace(0, 2*np.pi, sides, endpoint=False) + rotation
-            x = center[0] + radius * np.cos(angles)
-            y = center[1] + radius * np.sin(angles)
-            return np.column_stack([x, y])
-        
-        def recursive_fractal(vertices, current_depth):
-            self.all_elements.append((vertices.copy(), current_depth, colors[current_depth]))
-            
-            if current_depth >= depth:
-                return
-                
-            center = np.mean(vertices, axis=0)
-            new_radius = np.linalg.norm(vertices[0] - center) * scale
-            
-            for i in range(sides):
-                next_i = (i + 1) % sides
-                new_center = center + (vertices[i] - center) * (1 - scale)
-                new_vertices = generate_polygon(new_center, new_radius)
-                recursive_fractal(new_vertices, current_depth+1)
-        
-        initial = generate_polygon((0, 0), 4)
-        recursive_fractal(initial, 0)
+        self.all_elements = regular_levels(sides, depth, scale, dtype=ELEMENT_DTYPE)
 
-if __name__ == "__main__":
+def export_fractal(path, algorithm, sides, depth, scale, cache=None):
+    """Guarda el fractal de profundidad ``depth`` en un archivo .fractal, .svg o .pdf.
+
+    Solo se genera la raíz: los niveles se calculan por bloques mientras se
+    escriben, así que se pueden exportar profundidades que no caben en memoria.
+    """
+    build = lambda d: generate_polygon_levels(algorithm, sides, d, scale)
+    root = cache.get(polygon_key(algorithm, sides, scale), 0, build) if cache is not None else build(0)
+    writers = {".svg": write_svg, ".pdf": write_pdf}
+    writers.get(os.path.splitext(path)[1].lower(), export_polygons)(path, root, max_depth=depth)
+
+def iter_export_construction(path, algorithm, sides, depth, scale, frames=200, size=600, fps=20, workers=None,
+                             cache=None, root=None, cancelled=lambda: False, context=None):
+    """Guarda la construcción del fractal en un .gif o .mp4 y produce el número de fotogramas escritos.
+
+    Cada fotograma añade unos cuantos polígonos sobre la imagen del anterior
+    (ver PolygonRaster2D.iter_construction_frames), sin figura ni ax.clear(),
+    y los fotogramas se codifican en ``workers`` procesos (ver
+    FractalMovie.iter_write_movie). Solo se genera la raíz (o se usa ``root``):
+    los niveles se calculan por bloques según se pintan. El algoritmo "chaos"
+    muestra la construcción del fractal regular que aproxima.
+    """
+    if root is None:
+        key = polygon_key(algorithm, sides, scale, ELEMENT_DTYPE)
+        build = lambda d: generate_polygon_levels(algorithm, sides, d, scale, dtype=ELEMENT_DTYPE)
+        root = cache.get(key, 0, build) if cache is not None else build(0)
+    palette = None
+    if path.lower().endswith(".gif"):
+        # Fondo blanco y un color por nivel: la paleta del GIF es exacta
+        colors = np.round(root.palette(depth) * 255).astype(np.uint8)
+        palette = movie_palette([np.vstack([(255, 255, 255, 255), colors])[None]])
+    images = iter_construction_frames(root, size, frames=frames, max_depth=depth)
+    yield from iter_write_movie(path, images, (size, size), fps, palette, workers=workers, cancelled=cancelled,
+                                context=context)
+
+def run_app():
+    load_gui()
     root = tk.Tk()
     app = AnimatedFractalGeneratorApp(root)
 
     try:
         root.mainloop()
     except KeyboardInterrupt:
-        app.on_close()
\ No newline at end of file
+        app.on_close()
+
+def render_main(args):
+    """Renderiza uno o varios presets a imágenes con el backend Agg"""
+    if args.sweep:
+        jobs = [(output_path(args.out, name), params) for name, params in load_sweep(args.sweep)]
+    elif args.preset:
+        jobs = [(args.out, PRESETS[args.preset])]
+    else:
+        jobs = [(args.out, {"sides": args.sides, "depth": args.depth,
+                            "scale": args.scale, "algorithm": args.algorithm, "samples": args.samples})]
+
+    # Una sola figura y una sola caché de geometría para todas las imágenes
+    fig, ax = agg_figure((args.size / args.dpi, args.size / args.dpi), args.dpi)
+    cache = GeometryCache(cache_dir=args.cache_dir)
+    profiler = Profiler() if args.profile else NULL_PROFILER
+    data = open_fractal(args.input) if args.input else None
+    for path, params in jobs:
+        if params["algorithm"] == "chaos":
+            # Atractor con el juego del caos, directo a la imagen
+            from matplotlib.image import imsave
+            root = cache.get(polygon_key("chaos", params["sides"], params["scale"], ELEMENT_DTYPE), 0,
+                             lambda d: generate_polygon_levels("chaos", params["sides"], d, params["scale"],
+                                                              dtype=ELEMENT_DTYPE))
+            with profiler.timer("chaos"):
+                image, _ = chaos_game(root, args.size, samples=int(params.get("samples", args.samples)))
+            imsave(path, image)
+        elif args.raster:
+            # Directo a la imagen, sin figura: los niveles se generan hasta el tamaño de un píxel
+            from matplotlib.image import imsave
+            if data is not None:
+                root = data.levels
+            else:
+                root = cache.get(polygon_key(params["algorithm"], params["sides"], params["scale"], ELEMENT_DTYPE), 0,
+                                 lambda d: generate_polygon_levels(params["algorithm"], params["sides"], d,
+                                                                  params["scale"], dtype=ELEMENT_DTYPE))
+            with profiler.timer("raster"):
+                image, _ = rasterize_levels(root, args.size, max_depth=params["depth"], line_width=args.line_width)
+            imsave(path, image)
+        else:
+            ax.clear()
+            render_fractal(ax, params["sides"], params["depth"], params["scale"], params["algorithm"],
+                           args.workers, args.split_depth, cache, profiler, data)
+            with profiler.timer("savefig"):
+                fig.savefig(path)
+        print(path)
+    if args.profile:
+        profiler.export_trace(args.profile)
+
+def export_main(args):
+    """Genera el fractal y lo guarda en el formato que indique la extensión de --out"""
+    export_fractal(args.out, args.algorithm, args.sides, args.depth, args.scale,
+                   GeometryCache(cache_dir=args.cache_dir))
+    print(args.out)
+
+def movie_main(args):
+    """Guarda la construcción del fractal en el .gif o .mp4 de --out"""
+    frames = iter_export_construction(args.out, args.algorithm, args.sides, args.depth, args.scale, args.frames,
+                                      args.size, args.fps, args.workers, GeometryCache(cache_dir=args.cache_dir))
+    for count in frames:
+        print(f"\r{count}", end="", flush=True)
+    print(f"\r{args.out}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generador de fractales de polígonos 2D")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("gui", help="abre la interfaz gráfica (por defecto)")
+
+    render = commands.add_parser("render", help="renderiza sin ventana a archivos de imagen")
+    render.add_argument("--algorithm", choices=ALGORITHMS, default="sierpinski")
+    render.add_argument("--sides", type=int, default=None, help="por defecto, 3 para sierpinski y 4 para carpet")
+    render.add_argument("--depth", type=int, default=5)
+    render.add_argument("--scale", type=float, default=0.5)
+    render.add_argument("--preset", choices=list(PRESETS))
+    render.add_argument("--workers", type=int, help="procesos para generar la geometría en paralelo")
+    render.add_argument("--split-depth", type=int, help="nivel en el que se reparten los subárboles entre procesos")
+    render.add_argument("--cache-dir", help="directorio donde guardar y reutilizar la geometría (.npz)")
+    render.add_argument("--raster", action="store_true", help="pinta los polígonos directamente en la imagen, sin matplotlib")
+    render.add_argument("--samples", type=int, default=2_000_000, help="puntos del juego del caos (--algorithm chaos)")
+    render.add_argument("--line-width", type=int, default=1, help="grosor de línea en píxeles para --raster")
+    render.add_argument("--size", type=int, default=800, help="tamaño de la imagen en píxeles")
+    render.add_argument("--dpi", type=int, default=100)
+    render.add_argument("--profile", metavar="TRAZA", help="guarda los tiempos de cada fase como traza de Chrome (.json)")
+    render.add_argument("--input", help="dibuja la geometría de un archivo .fractal en lugar de generarla")
+    render.add_argument("--sweep", help="JSON con presets (mismas claves que PRESETS); --out pasa a ser un directorio")
+    render.add_argument("--out", default="fractal.png")
+
+    export = commands.add_parser("export", help="guarda la geometría en un archivo .fractal, .svg o .pdf")
+    export.add_argument("--algorithm", choices=ALGORITHMS, default="sierpinski")
+    export.add_argument("--sides", type=int, default=None, help="por defecto, 3 para sierpinski y 4 para carpet")
+    export.add_argument("--depth", type=int, default=5)
+    export.add_argument("--scale", type=float, default=0.5)
+    export.add_argument("--cache-dir", help="directorio donde guardar y reutilizar la geometría (.npz)")
+    export.add_argument("--out", default="fractal.fractal")
+
+    movie = commands.add_parser("movie", help="guarda la construcción del fractal en un .gif o .mp4 (con ffmpeg)")
+    movie.add_argument("--algorithm", choices=ALGORITHMS, default="sierpinski")
+    movie.add_argument("--sides", type=int, default=None, help="por defecto, 3 para sierpinski y 4 para carpet")
+    movie.add_argument("--depth", type=int, default=5)
+    movie.add_argument("--scale", type=float, default=0.5)
+    movie.add_argument("--frames", type=int, default=200, help="fotogramas aproximados de la construcción")
+    movie.add_argument("--fps", type=float, default=20)
+    movie.add_argument("--size", type=int, default=600, help="tamaño de los fotogramas en píxeles")
+    movie.add_argument("--workers", type=int, help="procesos para codificar los fotogramas")
+    movie.add_argument("--cache-dir", help="directorio donde guardar y reutilizar la geometría (.npz)")
+    movie.add_argument("--out", default="fractal.gif")
+
+    args = parser.parse_args(argv)
+    if args.command in ("render", "export", "movie") and args.sides is None:
+        args.sides = {"sierpinski": 3, "carpet": 4}.get(args.algorithm, 5)
+    if args.command == "render":
+        render_main(args)
+    elif args.command == "export":
+        export_main(args)
+    elif args.command == "movie":
+        movie_main(args)
+    else:
+        run_app()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,239 @@
+import numpy as np
+from FractalParallel import expand_levels, expand_points, iter_level_ranges
+
+
+def regular_polygon(sides, rotation=0):
+    """Vértices de un polígono regular de radio 1 centrado en el origen"""
+    angles = np.linspace(0, 2*np.pi, sides, endpoint=False) + rotation
+    return np.column_stack([np.cos(angles), np.sin(angles)])
+
+
+def close_outlines(vertices):
+    """Repite el primer vértice de cada polígono para obtener contornos cerrados (K, lados+1, 2)"""
+    return np.concatenate([vertices, vertices[:, :1]], axis=1)
+
+
+class PolygonLevels:
+    """Geometría de un fractal de polígonos almacenada nivel a nivel.
+
+    Todos los polígonos son copias trasladadas y escaladas de ``template``, así
+    que cada nivel d guarda solo los centros ``centers[d]`` (K, 2) y el radio
+    común ``radii[d]``. Los hijos del polígono p del nivel d ocupan las
+    posiciones b*p ... b*p+b-1 del nivel d+1, donde b = len(pivots).
+
+    El color tampoco se guarda por polígono: sale de la paleta por nivel
+    (ver palette y depths). Los vértices se calculan con el tipo de los
+    centros, así que con centros float32 cada polígono ocupa 8 bytes.
+    """
+
+    def __init__(self, template, pivots, ratio, centers, radii, cmap):
+        self.template = template
+        self.pivots = pivots
+        self.ratio = ratio
+        self.centers = centers
+        self.radii = radii
+        self.cmap = cmap
+        self._offsets = np.cumsum([0] + [len(level) for level in centers])
+        self._palette = None
+
+    @property
+    def max_depth(self):
+        return len(self.centers) - 1
+
+    @property
+    def sides(self):
+        return len(self.template)
+
+    def counts(self):
+        """Número de polígonos en cada nivel"""
+        return [len(level) for level in self.centers]
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    @property
+    def nbytes(self):
+        return sum(level.nbytes for level in self.centers)
+
+    def truncated(self, max_depth):
+        """Niveles 0..max_depth, compartiendo los arrays sin copiarlos"""
+        return PolygonLevels(self.template, self.pivots, self.ratio, self.centers[:max_depth + 1],
+                             self.radii[:max_depth + 1], self.cmap)
+
+    def _deeper(self, max_depth):
+        """Radios y desplazamientos de los hijos de los niveles que faltan hasta ``max_depth``"""
+        radii = self.radii[-1] * self.ratio ** np.arange(max_depth - self.max_depth + 1, dtype=float)
+        dtype = self.centers[-1].dtype
+        displacements = [((1 - self.ratio) * r * self.pivots).astype(dtype) for r in radii[:-1]]
+        return radii[1:], displacements
+
+    def _place(self, centers, radius):
+        """Vértices (K, lados, 2) de los polígonos de radio ``radius`` con esos centros, en su mismo tipo"""
+        return centers[:, None, :] + (radius * self.template).astype(centers.dtype)
+
+    def extended(self, max_depth, workers=None, split_depth=None):
+        """Añade niveles hasta ``max_depth`` a partir de los centros del último nivel"""
+        radii, displacements = self._deeper(max_depth)
+        new = expand_levels(self.centers[-1], displacements, workers, split_depth)[1:]
+        return PolygonLevels(self.template, self.pivots, self.ratio, self.centers + new,
+                             np.concatenate([self.radii, radii]), self.cmap)
+
+    def iter_levels(self, max_depth=None):
+        """Produce (nivel, vértices) nivel a nivel.
+
+        Con ``max_depth`` mayor que la profundidad calculada, los niveles que
+        faltan se generan sobre la marcha conservando solo el anterior.
+        """
+        max_depth = self.max_depth if max_depth is None else max_depth
+        for depth in range(min(max_depth, self.max_depth) + 1):
+            yield depth, self.vertices(depth)
+
+        centers = self.centers[-1]
+        radii, displacements = self._deeper(max_depth)
+        for depth, (radius, displacement) in enumerate(zip(radii, displacements), self.max_depth + 1):
+            centers = expand_points(centers, displacement)
+            yield depth, self._place(centers, radius)
+
+    def iter_chunks(self, max_depth=None, max_elements=65536):
+        """Produce (nivel, inicio, vértices) en bloques de como máximo ``max_elements`` polígonos.
+
+        El recorrido es en anchura y los niveles que faltan hasta ``max_depth`` se
+        generan bloque a bloque, así que la memoria no depende de la profundidad.
+        """
+        for depth, start, centers, radius in self.iter_center_chunks(max_depth, max_elements):
+            yield depth, start, self._place(centers, radius)
+
+    def iter_center_chunks(self, max_depth=None, max_elements=65536):
+        """Como iter_chunks, pero produce (nivel, inicio, centros, radio) sin construir los vértices"""
+        max_depth = self.max_depth if max_depth is None else max_depth
+        radii, displacements = self._deeper(max_depth)
+        radii = np.concatenate([self.radii, radii])
+        for depth, start, centers in iter_level_ranges(self.centers, displacements, max_depth, max_elements):
+            yield depth, start, centers, radii[depth]
+
+    def iter_range(self, start, stop):
+        """Produce (nivel, vértices) de los polígonos start..stop-1, agrupados por nivel"""
+        for depth in range(len(self.centers)):
+            low, high = max(start, self._offsets[depth]), min(stop, self._offsets[depth + 1])
+            if low < high:
+                offset = self._offsets[depth]
+                yield depth, self._place(self.centers[depth][low - offset:high - offset], self.radii[depth])
+
+    def to_arrays(self):
+        """Arrays planos para guardar la geometría en un archivo .npz"""
+        return {
+            "kind": np.array("polygon"),
+            "centers": np.concatenate(self.centers),
+            "counts": np.array(self.counts()),
+            "radii": self.radii,
+            "template": self.template,
+            "pivots": self.pivots,
+            "ratio": np.array(self.ratio),
+            "cmap": np.array(self.cmap),
+        }
+
+    @classmethod
+    def from_arrays(cls, data):
+        """Reconstruye los niveles a partir de los arrays de to_arrays()"""
+        centers = np.split(data["centers"], np.cumsum(data["counts"])[:-1])
+        return cls(data["template"], data["pivots"], float(data["ratio"]), centers, data["radii"], str(data["cmap"]))
+
+    def vertices(self, depth=None):
+        """Vértices de los polígonos como array (K, lados, 2)"""
+        if depth is None:
+            return np.concatenate([self.vertices(d) for d in range(len(self.centers))])
+        return self._place(self.centers[depth], self.radii[depth])
+
+    def outlines(self, depth=None):
+        """Contornos cerrados (K, lados+1, 2), listos para una LineCollection"""
+        return close_outlines(self.vertices(depth))
+
+    def bounds(self):
+        """Esquinas (mínima, máxima) del rectángulo que contiene todos los polígonos"""
+        low = np.min([c.min(axis=0) + r * self.template.min(axis=0) for c, r in zip(self.centers, self.radii)], axis=0)
+        high = np.max([c.max(axis=0) + r * self.template.max(axis=0) for c, r in zip(self.centers, self.radii)], axis=0)
+        return low, high
+
+    def depths(self):
+        """Profundidad de cada polígono (uint8), en el mismo orden que vertices()"""
+        return np.repeat(np.arange(len(self.centers), dtype=np.min_scalar_type(self.max_depth)), self.counts())
+
+    def palette(self, max_depth=None):
+        """Colores RGBA por nivel tomados del mapa de colores del algoritmo"""
+        import matplotlib
+        if max_depth is not None and max_depth != self.max_depth:
+            return matplotlib.colormaps[self.cmap](np.linspace(0, 1, max_depth + 1))
+        if self._palette is None:
+            self._palette = matplotlib.colormaps[self.cmap](np.linspace(0, 1, self.max_depth + 1))
+        return self._palette
+
+    def __getitem__(self, index):
+        """Elemento en el formato (vértices, profundidad, color) de all_elements"""
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        depth = int(np.searchsorted(self._offsets, index, side='right')) - 1
+        centers = self.centers[depth][index - self._offsets[depth]:][:1]
+        return self._place(centers, self.radii[depth])[0], depth, self.palette()[depth]
+
+    def __iter__(self):
+        colors = self.palette()
+        for depth in range(len(self.centers)):
+            for vertices in self.vertices(depth):
+                yield vertices, depth, colors[depth]
+
+
+def build_levels(template, pivots, ratio, center, radius, depth, cmap, workers=None, split_depth=None,
+                 dtype=np.float64):
+    """Construye cada nivel a partir del anterior desplazando todos los centros a la vez.
+
+    ``dtype`` es el tipo de los centros (np.float32 usa la mitad de memoria).
+    """
+    root = PolygonLevels(template, pivots, ratio, [np.asarray(center, dtype=dtype).reshape(1, 2)],
+                         np.array([float(radius)]), cmap)
+    return root.extended(depth, workers, split_depth)
+
+
+def sierpinski_levels(depth, workers=None, split_depth=None, dtype=np.float64):
+    """Triángulo de Sierpinski: cada triángulo se reduce a la mitad hacia sus vértices"""
+    initial = np.array([[0, 0], [1, 0], [0.5, np.sqrt(3)/2]]) * 8 - np.array([4, 2.5])
+    center = initial.mean(axis=0)
+    template = initial - center
+    return build_levels(template, template, 0.5, center, 1, depth, 'plasma', workers, split_depth, dtype)
+
+
+def carpet_levels(depth, workers=None, split_depth=None, dtype=np.float64):
+    """Alfombra de Sierpinski: 8 subcuadrados de un tercio, sin el central"""
+    template = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], dtype=float)
+    pivots = np.array([[i - 1, j - 1] for i in range(3) for j in range(3) if (i, j) != (1, 1)], dtype=float)
+    return build_levels(template, pivots, 1/3, (0, 0), 4, depth, 'viridis', workers, split_depth, dtype)
+
+
+def regular_levels(sides, depth, scale, workers=None, split_depth=None, dtype=np.float64):
+    """Fractal regular: un polígono reducido por ``scale`` hacia cada vértice"""
+    template = regular_polygon(sides)
+    return build_levels(template, template, scale, (0, 0), 4, depth, 'inferno', workers, split_depth, dtype)
+
+
+def polygon_key(algorithm, sides, scale, dtype=np.float64):
+    """Parámetros que determinan la geometría, sin la profundidad (clave de GeometryCache).
+
+    El algoritmo "chaos" usa los mapas del fractal regular con los mismos lados
+    y escala. El tipo de los centros forma parte de la clave, para que los
+    niveles float32 de la interfaz no acaben en una exportación float64.
+    """
+    if algorithm == "sierpinski" and sides == 3:
+        key = ("sierpinski",)
+    elif algorithm == "carpet" and sides == 4:
+        key = ("carpet",)
+    else:
+        key = ("regular", sides, float(scale))
+    return key + (np.dtype(dtype).name,)
+
+
+def generate_polygon_levels(algorithm, sides, depth, scale, workers=None, split_depth=None, dtype=np.float64):
+    """Elige el algoritmo con las mismas reglas que AnimatedFractalGeneratorApp"""
+    if algorithm == "sierpinski" and sides == 3:
+        return sierpinski_levels(depth, workers, split_depth, dtype)
+    elif algorithm == "carpet" and sides == 4:
+        return carpet_levels(depth, workers, split_depth, dtype)
+    return regular_levels(sides, depth, scale, workers, split_depth, dtype)
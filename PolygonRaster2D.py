@@ -0,0 +1,205 @@
+import numpy as np
+
+
+def fit_view(bounds, width, height, margin=0.05):
+    """Centro y escala (píxeles por unidad) para encajar ``bounds`` en la imagen conservando la proporción"""
+    low, high = np.asarray(bounds[0], dtype=float), np.asarray(bounds[1], dtype=float)
+    span = (high - low) * (1 + 2*margin)
+    scale = min(width / span[0], height / span[1])
+    return (low + high) / 2, scale
+
+
+def view_extent(center, scale, width, height):
+    """Extensión (xmin, xmax, ymin, ymax) de la imagen, en el formato de ``imshow``"""
+    half_w, half_h = width / 2 / scale, height / 2 / scale
+    return (center[0] - half_w, center[0] + half_w, center[1] - half_h, center[1] + half_h)
+
+
+def outline_stencil(template, radius_px):
+    """Puntos a lo largo del contorno de la plantilla, separados menos de un píxel a radio ``radius_px``"""
+    ends = np.roll(template, -1, axis=0)
+    samples = []
+    for start, end in zip(template, ends):
+        steps = int(np.ceil(np.linalg.norm(end - start) * radius_px)) + 1
+        t = np.linspace(0, 1, steps, endpoint=False)[:, None]
+        samples.append(start + t * (end - start))
+    return np.concatenate(samples)
+
+
+def stamp(image, points, color, line_width=1):
+    """Pinta ``color`` en los píxeles de ``points`` (M, 2), en coordenadas de imagen"""
+    height, width = image.shape[:2]
+    pixels = np.floor(points).astype(np.intp)
+    low = -(line_width // 2)
+    for dy in range(low, low + line_width):
+        for dx in range(low, low + line_width):
+            x = pixels[:, 0] + dx
+            y = pixels[:, 1] + dy
+            inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+            image[y[inside], x[inside]] = color
+
+
+class OutlinePainter:
+    """Pinta bloques de polígonos de un PolygonLevels en una imagen RGBA de NumPy.
+
+    La vista se ajusta a ``bounds`` (por defecto, los límites de los niveles) y
+    cada nivel se pinta con su color del mapa de colores del algoritmo, encima
+    de lo ya pintado. La plantilla de píxeles del contorno se calcula una vez
+    por nivel.
+    """
+
+    def __init__(self, levels, width, height=None, max_depth=None, bounds=None, line_width=1,
+                 background=(255, 255, 255, 255)):
+        self.width = width
+        self.height = height or width
+        self.template = levels.template
+        self.line_width = line_width
+        self.center, self.scale = fit_view(levels.bounds() if bounds is None else bounds, self.width, self.height)
+        self.image = np.empty((self.height, self.width, 4), dtype=np.uint8)
+        self.image[:] = background
+        self.colors = np.round(levels.palette(max_depth) * 255).astype(np.uint8)
+        self.size = np.ptp(levels.template, axis=0).max()
+        self.flip = np.array([self.scale, -self.scale])
+        self.origin = np.array([self.width / 2, self.height / 2]) - self.center * self.flip
+        self.stencils = {}
+
+    @property
+    def extent(self):
+        """Extensión de la imagen para ``imshow``"""
+        return view_extent(self.center, self.scale, self.width, self.height)
+
+    def paint(self, depth, centers, radius):
+        """Pinta los polígonos de un bloque; devuelve False si miden menos de un píxel.
+
+        Los polígonos menores que un píxel se pintan marcando solo el píxel de su centro.
+        """
+        pixels = centers * self.flip + self.origin
+        radius_px = radius * self.scale
+
+        if radius_px * self.size < 1:
+            stamp(self.image, pixels, self.colors[depth], self.line_width)
+            return False
+
+        if depth not in self.stencils:
+            self.stencils[depth] = outline_stencil(self.template, radius_px) * np.array([radius_px, -radius_px])
+        points = pixels[:, None, :] + self.stencils[depth]
+        stamp(self.image, points.reshape(-1, 2), self.colors[depth], self.line_width)
+        return True
+
+
+def rasterize_levels(levels, width, height=None, max_depth=None, bounds=None, line_width=1,
+                     background=(255, 255, 255, 255), max_elements=65536, cancelled=lambda: False):
+    """Dibuja los contornos de un PolygonLevels directamente en una imagen RGBA de NumPy.
+
+    Cada nivel se pinta con su color del mapa de colores del algoritmo, encima de
+    los anteriores. En cuanto los polígonos de un nivel miden menos de un píxel
+    se marca solo el píxel de cada centro y ya no se generan niveles más
+    profundos. Los niveles que falten hasta ``max_depth`` se generan por bloques.
+    Devuelve la imagen (alto, ancho, 4) de uint8 y su extensión para ``imshow``.
+    ``cancelled()`` se comprueba entre bloques; si devuelve True, la imagen se
+    devuelve tal como esté.
+    """
+    max_depth = levels.max_depth if max_depth is None else max_depth
+    painter = OutlinePainter(levels, width, height, max_depth, bounds, line_width, background)
+
+    last_depth = max_depth
+    for depth, _, centers, radius in levels.iter_center_chunks(max_depth, max_elements):
+        if depth > last_depth or cancelled():
+            break
+        if not painter.paint(depth, centers, radius):
+            # Polígonos menores que un píxel: los niveles siguientes caerían en los mismos píxeles
+            last_depth = depth
+
+    return painter.image, painter.extent
+
+
+def iter_construction_frames(levels, width, height=None, frames=100, max_depth=None, line_width=1,
+                             background=(255, 255, 255, 255)):
+    """Produce las imágenes RGBA de la construcción del fractal, como la animación de la aplicación.
+
+    Los polígonos se añaden en el orden de los niveles, unos total/``frames``
+    por fotograma (sin mezclar niveles en un mismo fotograma), y cada
+    fotograma se pinta sobre el anterior sin volver a pintar nada. Los niveles
+    que falten hasta ``max_depth`` se generan por bloques. Cada imagen
+    producida es una copia, que se puede guardar o enviar a otro proceso.
+    """
+    max_depth = levels.max_depth if max_depth is None else max_depth
+    counts = levels.counts()[:max_depth + 1]
+    for _ in range(levels.max_depth, max_depth):
+        counts.append(counts[-1] * len(levels.pivots))
+    per_frame = max(1, -(-sum(counts) // frames))
+
+    painter = OutlinePainter(levels, width, height, max_depth, line_width=line_width, background=background)
+    for depth, _, centers, radius in levels.iter_center_chunks(max_depth, per_frame):
+        painter.paint(depth, centers, radius)
+        yield painter.image.copy()
+
+
+def ifs_maps(levels):
+    """Razón y desplazamientos de los mapas x -> ratio*x + offsets[i] que llevan el polígono raíz a cada hijo"""
+    center, radius = levels.centers[0][0], levels.radii[0]
+    return levels.ratio, (1 - levels.ratio) * (center + radius * levels.pivots)
+
+
+def density_image(counts, cmap, background=(255, 255, 255, 255)):
+    """Convierte un histograma de puntos en una imagen RGBA con escala logarítmica"""
+    import matplotlib
+    image = np.empty(counts.shape + (4,), dtype=np.uint8)
+    image[:] = background
+    hit = counts > 0
+    if hit.any():
+        density = np.log1p(counts[hit]) / np.log1p(counts.max())
+        image[hit] = np.round(matplotlib.colormaps[cmap](density) * 255).astype(np.uint8)
+    return image
+
+
+def chaos_game(levels, width, height=None, samples=2_000_000, batch=65536, bounds=None, seed=None,
+               background=(255, 255, 255, 255)):
+    """Dibuja el atractor de un PolygonLevels (profundidad infinita) con el juego del caos.
+
+    ``batch`` puntos iteran a la vez eligiendo al azar uno de los mapas del
+    fractal (ver ifs_maps) y cada posición se acumula en un histograma del tamaño
+    de la imagen, así que la memoria no depende de ``samples`` y el tiempo crece
+    linealmente con él. Devuelve la imagen (alto, ancho, 4) de uint8 con la
+    densidad en el mapa de colores del algoritmo y su extensión para ``imshow``.
+    """
+    for image, extent, _ in iter_chaos_game(levels, width, height, samples, batch, bounds, seed, background,
+                                            rounds=1):
+        pass
+    return image, extent
+
+
+def iter_chaos_game(levels, width, height=None, samples=2_000_000, batch=65536, bounds=None, seed=None,
+                    background=(255, 255, 255, 255), rounds=10, cancelled=lambda: False):
+    """Como chaos_game, pero produce (imagen, extensión, muestras) ``rounds`` veces mientras acumula.
+
+    ``cancelled()`` se comprueba entre tandas de puntos.
+    """
+    height = height or width
+    low, high = levels.bounds() if bounds is None else bounds
+    center, scale = fit_view((low, high), width, height)
+    extent = view_extent(center, scale, width, height)
+    flip = np.array([scale, -scale])
+    origin = np.array([width / 2, height / 2]) - center * flip
+    ratio, offsets = ifs_maps(levels)
+    rng = np.random.default_rng(seed)
+
+    # Iteraciones previas hasta que la distancia al atractor sea menor que un píxel
+    span = max(np.ptp(np.asarray([low, high]), axis=0).max() * scale, 1)
+    warmup = int(np.ceil(np.log(span) / -np.log(ratio))) + 1
+    points = low + rng.random((min(batch, samples), 2)) * (np.asarray(high) - low)
+    for _ in range(warmup):
+        points = ratio * points + offsets[rng.integers(len(offsets), size=len(points))]
+
+    counts = np.zeros(height * width, dtype=np.int64)
+    done = 0
+    for goal in np.linspace(0, samples, rounds + 1)[1:].astype(np.int64):
+        while done < goal:
+            if cancelled():
+                return
+            points = ratio * points + offsets[rng.integers(len(offsets), size=len(points))]
+            pixels = np.floor(points[:goal - done] * flip + origin).astype(np.intp)
+            inside = (pixels[:, 0] >= 0) & (pixels[:, 0] < width) & (pixels[:, 1] >= 0) & (pixels[:, 1] < height)
+            counts += np.bincount(pixels[inside, 1] * width + pixels[inside, 0], minlength=height * width)
+            done += len(pixels)
+        yield density_image(counts.reshape(height, width), levels.cmap, background), extent, done